@@ -0,0 +1,191 @@
+"""Headless frame-time benchmarks for the interactive simulation.
+
+Runs WoWBossSimulation under SDL's dummy video driver with a given number of
+stars, timing event handling, update, draw and each draw stage separately
+through the game's own FrameProfiler. Results are written as JSON and can be
+checked against a stored baseline:
+
+    python benchmark.py --stars 6 24 96 --output bench.json
+    python benchmark.py --stars 6 24 96 --save-baseline bench_baseline.json
+    python benchmark.py --stars 6 24 96 --baseline bench_baseline.json
+    python benchmark.py --stars 48 --wave-interval 1 --wave-lifetime 6
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+# Must be set before pygame opens a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from sim_core import DEFAULT_WAVE_LIFETIME, FPS, SimulationParams
+from sim_analysis import sample_placement
+from wow_boss_sim import FrameProfiler, GameState, WoWBossSimulation
+
+STAGES = FrameProfiler.PHASES + ("frame",)
+PERCENTILES = (50, 95, 99)
+
+def summarize(samples):
+    """Milliseconds at each percentile (plus the mean) for every stage"""
+    summary = {}
+    for stage, values in samples.items():
+        values = np.asarray(values) * 1000.0
+        stats = {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+        stats["mean"] = float(values.mean())
+        summary[stage] = stats
+    return summary
+
+def run_benchmark(star_count, frames=1200, warmup=60, dirty_rects=False, heatmap=False, seed=0,
+                  wave_interval=0, wave_lifetime=DEFAULT_WAVE_LIFETIME, exposure=False):
+    """Plays `frames` frames of a fight with `star_count` random stars.
+
+    The simulation advances a fixed 1/FPS per frame, so every run renders the
+    same fight regardless of how fast the machine is. Returns the per-stage
+    summary, the game's time to first frame in milliseconds and the average
+    number of rings on screen.
+    """
+    game = WoWBossSimulation(dirty_rects=dirty_rects)
+    params = SimulationParams()
+    params.emission_interval = wave_interval
+    params.wave_lifetime = wave_lifetime
+    game.load_scenario(sample_placement(np.random.default_rng(seed), params, star_count), params)
+    if heatmap:
+        game.show_heatmap = True
+        game.refresh_heatmap()
+        game.heatmap.wait()
+    game.exposure_overlay.enabled = exposure
+    game.state = GameState.PLAYING
+
+    samples = {stage: [] for stage in STAGES}
+    ring_counts = []
+    for frame in range(warmup + frames):
+        start = time.perf_counter()
+        game.run_frame(1.0 / FPS)
+        elapsed = time.perf_counter() - start
+        if frame < warmup:
+            continue
+        for phase in FrameProfiler.PHASES:
+            samples[phase].append(game.profiler.timings.get(phase, 0.0))
+        samples["frame"].append(elapsed)
+        ring_counts.append(len(game.core.get_rings(game.get_display_time())))
+    pygame.quit()
+    return summarize(samples), game.time_to_first_frame * 1000.0, float(np.mean(ring_counts))
+
+def get_config_name(star_count, dirty_rects, heatmap, wave_interval=0, wave_lifetime=DEFAULT_WAVE_LIFETIME,
+                    exposure=False):
+    name = f"stars={star_count}"
+    if wave_interval:
+        name += f",waves={wave_interval}x{wave_lifetime}"
+    if dirty_rects:
+        name += ",dirty_rects"
+    if heatmap:
+        name += ",heatmap"
+    if exposure:
+        name += ",exposure"
+    return name
+
+def check_regressions(results, baseline, tolerance, slack_ms, percentile="p95"):
+    """Stages whose percentile got slower than the baseline allows"""
+    regressions = []
+    for name, config in results["configs"].items():
+        base_config = baseline.get("configs", {}).get(name)
+        if base_config is None:
+            continue
+        for stage, stats in config["stages"].items():
+            base_stats = base_config["stages"].get(stage)
+            if base_stats is None:
+                continue
+            limit = base_stats[percentile] * (1 + tolerance) + slack_ms
+            if stats[percentile] > limit:
+                regressions.append(f"{name} {stage}: {percentile} {stats[percentile]:.3f} ms "
+                                   f"> {limit:.3f} ms (baseline {base_stats[percentile]:.3f} ms)")
+    return regressions
+
+def print_results(results):
+    header = f"{'stage':<12}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES) + f"{'mean':>10}"
+    for name, config in results["configs"].items():
+        print(f"\n{name} ({results['frames']} frames, {config['rings']:.0f} rings on average, ms; "
+              f"first frame after {config['time_to_first_frame_ms']:.1f} ms)")
+        print(header)
+        for stage in STAGES:
+            stats = config["stages"][stage]
+            print(f"{stage:<12}" + "".join(f"{stats[f'p{p}']:>10.3f}" for p in PERCENTILES)
+                  + f"{stats['mean']:>10.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless frame-time benchmark")
+    parser.add_argument('--stars', type=int, nargs='+', default=[6],
+                        help="Star counts to benchmark (each star has one ring)")
+    parser.add_argument('--frames', type=int, default=1200)
+    parser.add_argument('--warmup', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dirty-rects', action='store_true')
+    parser.add_argument('--heatmap', action='store_true')
+    parser.add_argument('--exposure', action='store_true', help="Show the live damage exposure overlay")
+    parser.add_argument('--wave-interval', type=int, default=0,
+                        help="Stars drop a wave every this many expansion levels (0 for none)")
+    parser.add_argument('--wave-lifetime', type=int, default=DEFAULT_WAVE_LIFETIME,
+                        help="Expansion levels each wave lasts")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--save-baseline', help="Write results as a new baseline JSON file")
+    parser.add_argument('--baseline', help="Fail if any stage regresses past this baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative slowdown of a stage's p95 (default 0.25)")
+    parser.add_argument('--slack-ms', type=float, default=0.1,
+                        help="Absolute slack added to every limit, for very fast stages")
+    args = parser.parse_args(argv)
+
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "video_driver": os.environ["SDL_VIDEODRIVER"],
+        },
+        "frames": args.frames,
+        "configs": {},
+    }
+    for star_count in args.stars:
+        name = get_config_name(star_count, args.dirty_rects, args.heatmap,
+                               args.wave_interval, args.wave_lifetime, args.exposure)
+        stages, time_to_first_frame, rings = run_benchmark(
+            star_count, args.frames, args.warmup, args.dirty_rects, args.heatmap, args.seed,
+            args.wave_interval, args.wave_lifetime, args.exposure)
+        results["configs"][name] = {
+            "stars": star_count,
+            "wave_interval": args.wave_interval,
+            "wave_lifetime": args.wave_lifetime,
+            "rings": rings,
+            "dirty_rects": args.dirty_rects,
+            "heatmap": args.heatmap,
+            "exposure": args.exposure,
+            "time_to_first_frame_ms": time_to_first_frame,
+            "stages": stages,
+        }
+    print_results(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = check_regressions(results, baseline, args.tolerance, args.slack_ms)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
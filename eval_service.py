@@ -0,0 +1,344 @@
+"""Local batch evaluation service: scenarios in, fight metrics out.
+
+Keeps one long-running process with a pool of worker processes, so tools can
+evaluate many scenarios without paying Python startup for each one. Requests
+use the scenario file layout, plus an optional request id, standing player
+positions and sampling options:
+
+    {"id": 1, "stars": [{"x": 500, "y": 300, "clockwise": true}, ...],
+     "params": {"rotation_speed": 0.3}, "players": [[600, 320], [450, 280]]}
+
+The service has two transports:
+
+    python eval_service.py stdio              # one JSON request per line in, one response per line out
+    python eval_service.py http --port 8765   # POST /evaluate, a request or a list of them
+
+Responses carry the request id, the scenario hash and the metrics. Results are
+cached by scenario hash, so repeated scenarios are answered without
+recomputing. stdio responses come back in completion order, so match them on
+the id.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from sim_core import ARENA_RADIUS, SimulationCore, SimulationParams, StarPlacement
+from sim_analysis import compute_coverage, detect_hits, get_min_safe_area
+
+DEFAULT_CELL_SIZE = 8.0
+DEFAULT_TIME_STEP = 0.05
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+# Parameters the fight's timing and geometry divide by or step through
+POSITIVE_PARAMS = ('warning_duration', 'damage_duration', 'expansion_interval', 'star_size',
+                   'ring_spacing')
+# Limits on the work one request can ask of a worker
+MAX_DURATION = 600.0
+MIN_CELL_SIZE = 2.0
+MIN_TIME_STEP = 0.01
+MAX_SAMPLE_CELLS = 100_000_000  # Damage samples times arena grid cells, one byte each
+
+def normalize_request(request):
+    """Canonical scenario for a request, with every parameter spelled out.
+
+    Raises ValueError for malformed requests. Requests that only differ in key
+    order, the request id or parameters left at their defaults normalize to
+    the same scenario, and so share a hash.
+    """
+    if not isinstance(request, dict):
+        raise ValueError("request must be a JSON object")
+    try:
+        stars = [{'x': float(star['x']), 'y': float(star['y']), 'clockwise': bool(star['clockwise'])}
+                 for star in request['stars']]
+        players = [[float(x), float(y)] for x, y in request.get('players', [])]
+        duration = request.get('duration')
+        scenario = {
+            'stars': stars,
+            'params': SimulationParams.from_dict(request.get('params', {})).to_dict(),
+            'players': players,
+            'duration': None if duration is None else float(duration),
+            'cell_size': float(request.get('cell_size', DEFAULT_CELL_SIZE)),
+            'time_step': float(request.get('time_step', DEFAULT_TIME_STEP)),
+        }
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"malformed scenario: {e!r}") from None
+    if not np.isfinite([[star['x'], star['y']] for star in stars] + players).all():
+        raise ValueError("star and player positions must be finite")
+    if not scenario['cell_size'] >= MIN_CELL_SIZE:
+        raise ValueError(f"cell_size must be at least {MIN_CELL_SIZE}")
+    if not scenario['time_step'] >= MIN_TIME_STEP:
+        raise ValueError(f"time_step must be at least {MIN_TIME_STEP}")
+    if scenario['duration'] is not None and not 0 <= scenario['duration'] <= MAX_DURATION:
+        raise ValueError(f"duration must be between 0 and {MAX_DURATION}")
+    for attr in POSITIVE_PARAMS:
+        if not scenario['params'][attr] > 0:
+            raise ValueError(f"{attr} must be positive")
+    if not scenario['params']['ring_width'] >= 0:
+        raise ValueError("ring_width must not be negative")
+    check_workload(scenario)
+    return scenario
+
+def check_workload(scenario):
+    """Raises ValueError if evaluating the scenario would take too much memory"""
+    params = SimulationParams.from_dict(scenario['params'])
+    duration = scenario['duration']
+    if duration is None:
+        duration = SimulationCore(get_placements(scenario), params).get_fight_duration()
+        if not duration <= MAX_DURATION:
+            raise ValueError(f"fight lasts {duration:.0f}s, more than {MAX_DURATION:.0f}s")
+    # Upper bounds on the damage phases and the samples they are split into
+    interval = params.expansion_interval
+    phases = math.ceil(duration / interval) * math.ceil(min(interval, duration) / params.get_cycle_duration())
+    damage_time = min(duration, phases * params.damage_duration)
+    samples = damage_time / scenario['time_step'] + phases
+    cells = math.ceil(2 * ARENA_RADIUS / scenario['cell_size']) ** 2
+    if samples * cells > MAX_SAMPLE_CELLS:
+        raise ValueError("scenario too large to evaluate: use a larger cell_size or time_step, "
+                         "or a shorter duration")
+
+def get_scenario_hash(scenario):
+    return hashlib.sha256(json.dumps(scenario, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+def get_placements(scenario):
+    return [StarPlacement(star['x'], star['y'], star['clockwise']) for star in scenario['stars']]
+
+def evaluate_scenario(scenario):
+    """Metrics for a normalized scenario; runs in a worker process"""
+    placements = get_placements(scenario)
+    params = SimulationParams.from_dict(scenario['params'])
+    coverage = compute_coverage(placements, params, scenario['duration'], scenario['cell_size'],
+                                scenario['time_step'], keep_samples=True)
+
+    # Peak share of the arena hit during each damage phase
+    timeline = []
+    windows = params.get_damage_windows(coverage.duration)
+    if windows:
+        inside = np.count_nonzero(coverage.inside)
+        hit_fraction = coverage.hits.reshape(len(coverage.hits), -1).sum(axis=1) / inside
+        starts = np.array([start for start, _ in windows])
+        phase = np.searchsorted(starts, coverage.sample_times, side='right') - 1
+        peak = np.zeros(len(windows))
+        np.maximum.at(peak, phase, hit_fraction)
+        timeline = [{'start': start, 'end': min(end, coverage.duration), 'hit_fraction': float(peak[i])}
+                    for i, (start, end) in enumerate(windows)]
+
+    metrics = {
+        'duration': coverage.duration,
+        'safe_fraction': coverage.get_safe_fraction(),
+        'min_safe_area': get_min_safe_area(coverage),
+        'damage_timeline': timeline,
+    }
+    if scenario['players']:
+        log = detect_hits(placements, params, np.array(scenario['players']), coverage.duration,
+                          scenario['time_step'])
+        metrics['player_hits'] = log.get_hit_counts().tolist()
+    return metrics
+
+class EvaluationService:
+    """Queues scenario evaluations and runs them on a process pool.
+
+    Results are kept in an LRU cache keyed by scenario hash, and a scenario
+    already being evaluated is not queued a second time: later requests wait
+    for the same result.
+    """
+    def __init__(self, workers=None, cache_size=1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # scenario hash -> metrics, in LRU order
+        self.pending = {}  # scenario hash -> Future for a queued or running evaluation
+        self.hits = 0
+        self.misses = 0
+        self.queue = None
+        self.pool = None
+        self.tasks = []
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        # One dispatcher per worker keeps every process busy without
+        # piling jobs up inside the pool
+        self.tasks = [asyncio.create_task(self.dispatch()) for _ in range(self.workers)]
+
+    async def stop(self):
+        await self.queue.join()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.pool.shutdown()
+
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            key, scenario, future = await self.queue.get()
+            try:
+                metrics = await loop.run_in_executor(self.pool, evaluate_scenario, scenario)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                self.cache[key] = metrics
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+                future.set_result(metrics)
+            finally:
+                del self.pending[key]
+                self.queue.task_done()
+
+    async def evaluate(self, request):
+        """Response for one request: metrics, or an error message"""
+        response = {'id': request.get('id')} if isinstance(request, dict) else {'id': None}
+        try:
+            scenario = normalize_request(request)
+        except ValueError as e:
+            response['error'] = str(e)
+            return response
+
+        key = get_scenario_hash(scenario)
+        response['hash'] = key
+        metrics = self.cache.get(key)
+        if metrics is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            response.update(cached=True, metrics=metrics)
+            return response
+
+        self.misses += 1
+        future = self.pending.get(key)
+        if future is None:
+            future = self.pending[key] = asyncio.get_running_loop().create_future()
+            self.queue.put_nowait((key, scenario, future))
+        try:
+            # Shielded: a cancelled client must not cancel other waiters
+            metrics = await asyncio.shield(future)
+        except Exception as e:
+            response['error'] = f"evaluation failed: {e!r}"
+            return response
+        response.update(cached=False, metrics=metrics)
+        return response
+
+    def get_stats(self):
+        return {'workers': self.workers, 'cached': len(self.cache), 'pending': len(self.pending),
+                'cache_hits': self.hits, 'cache_misses': self.misses}
+
+def encode(response):
+    return json.dumps(response, separators=(',', ':'))
+
+async def serve_stdio(service):
+    """Answers one JSON request per stdin line until EOF"""
+    loop = asyncio.get_running_loop()
+
+    async def answer(line):
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {'id': None, 'error': f"invalid JSON: {e}"}
+        else:
+            response = await service.evaluate(request)
+        sys.stdout.write(encode(response) + "\n")
+        sys.stdout.flush()
+
+    answers = set()
+    while True:
+        # A blocking read on a thread works for pipes and consoles everywhere
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        if line.strip():
+            task = asyncio.create_task(answer(line))
+            answers.add(task)
+            task.add_done_callback(answers.discard)
+    await asyncio.gather(*answers)
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large"}
+
+async def handle_http(service, reader, writer):
+    """Minimal HTTP/1.1: POST /evaluate, GET /stats; one request per connection"""
+    status, body = 200, None
+    try:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        method, path = request_line[:2] if len(request_line) >= 2 else ("", "")
+        length = int(headers.get('content-length', 0))
+
+        if path == '/stats':
+            body = service.get_stats()
+        elif path != '/evaluate':
+            status, body = 404, {'error': f"unknown path {path!r}"}
+        elif method != 'POST':
+            status, body = 405, {'error': "use POST"}
+        elif length > MAX_REQUEST_BYTES:
+            status, body = 413, {'error': "request too large"}
+        else:
+            try:
+                payload = json.loads(await reader.readexactly(length))
+            except ValueError as e:
+                status, body = 400, {'error': f"invalid JSON: {e}"}
+            else:
+                # A list of scenarios is evaluated concurrently, answered in order
+                if isinstance(payload, list):
+                    body = list(await asyncio.gather(*(service.evaluate(r) for r in payload)))
+                else:
+                    body = await service.evaluate(payload)
+    except (ValueError, asyncio.IncompleteReadError) as e:
+        status, body = 400, {'error': f"bad request: {e}"}
+
+    data = encode(body).encode()
+    writer.write(f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                 f"Connection: close\r\n\r\n".encode('latin-1') + data)
+    try:
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def serve_http(service, host, port):
+    server = await asyncio.start_server(lambda r, w: handle_http(service, r, w), host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Evaluating scenarios on http://{address[0]}:{address[1]}/evaluate "
+          f"with {service.workers} workers", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+async def run(args):
+    service = EvaluationService(args.workers, args.cache_size)
+    await service.start()
+    try:
+        if args.command == 'stdio':
+            await serve_stdio(service)
+        else:
+            await serve_http(service, args.host, args.port)
+    finally:
+        await service.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve scenario evaluations to other tools")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU core)")
+    parser.add_argument('--cache-size', type=int, default=1024, help="Results kept in memory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stdio', help="JSON-lines requests on stdin, responses on stdout")
+    http_parser = commands.add_parser('http', help="HTTP server on a local port")
+    http_parser.add_argument('--host', default='127.0.0.1')
+    http_parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Offline frame export: renders a fight to a PNG sequence or a raw frame stream.
+
+Runs WoWBossSimulation under SDL's dummy video driver and steps it a fixed
+1/fps per frame, so the output does not depend on how fast the machine is.
+Frames are rendered on the main thread; a thread pool compresses and writes
+them while the next frames render:
+
+    python export_frames.py scenario.json --output frames/
+    python export_frames.py scenario.json --format raw --output - | \\
+        ffmpeg -f rawvideo -pix_fmt rgb24 -s 1194x671 -r 60 -i - fight.mp4
+"""
+import argparse
+import contextlib
+import os
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Must be set before pygame opens a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import pygame
+
+from sim_core import FPS, load_scenario
+from wow_boss_sim import GameState, WoWBossSimulation
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def encode_png(width, height, rgb, level=1):
+    """PNG file bytes for packed 8-bit RGB pixels.
+
+    Rows use the Up filter and zlib's run-length strategy, which on these
+    frames compresses both faster and smaller than unfiltered deflate. zlib
+    and numpy release the GIL, so frames encode in parallel on plain threads.
+    """
+    pixels = np.frombuffer(rgb, dtype=np.uint8).reshape(height, width * 3)
+    rows = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 0] = 2  # Up: each byte is stored as its difference from the byte above
+    rows[0, 1:] = pixels[0]
+    np.subtract(pixels[1:], pixels[:-1], out=rows[1:, 1:])
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 8, zlib.Z_RLE)
+    data = compressor.compress(rows.tobytes()) + compressor.flush()
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", header)
+            + png_chunk(b"IDAT", data) + png_chunk(b"IEND", b""))
+
+class FrameWriter:
+    """Hands frames to background threads, holding at most `max_pending` in memory"""
+    def __init__(self, output, frame_format="png", workers=None, compression=1, max_pending=32):
+        self.output = output
+        self.frame_format = frame_format
+        self.compression = compression
+        self.pending = deque()
+        self.max_pending = max_pending
+        if frame_format == "png":
+            os.makedirs(output, exist_ok=True)
+            self.stream = None
+            self.pool = ThreadPoolExecutor(max_workers=workers)
+        else:
+            self.stream = sys.stdout.buffer if output == "-" else open(output, 'wb')
+            # One writer keeps the stream in frame order
+            self.pool = ThreadPoolExecutor(max_workers=1)
+
+    def write_png(self, path, size, pixels):
+        with open(path, 'wb') as f:
+            f.write(encode_png(size[0], size[1], pixels, self.compression))
+
+    def submit(self, index, surface):
+        """Queues a copy of the surface's pixels as frame `index`"""
+        pixels = pygame.image.tobytes(surface, 'RGB')
+        if self.frame_format == "png":
+            path = os.path.join(self.output, f"frame_{index:05d}.png")
+            future = self.pool.submit(self.write_png, path, surface.get_size(), pixels)
+        else:
+            future = self.pool.submit(self.stream.write, pixels)
+        self.pending.append(future)
+        while len(self.pending) > self.max_pending:
+            self.pending.popleft().result()
+
+    def close(self):
+        while self.pending:
+            self.pending.popleft().result()
+        self.pool.shutdown()
+        if self.stream is not None:
+            self.stream.flush()
+            if self.stream is not sys.stdout.buffer:
+                self.stream.close()
+
+def export_frames(placements, params, output, frame_format="png", fps=FPS, duration=None,
+                  workers=None, compression=1):
+    """Renders the fight from time 0 to `duration` (default: the whole fight).
+
+    Returns the number of frames written.
+    """
+    writer = FrameWriter(output, frame_format, workers, compression)
+    # The game's own messages must not end up in a raw stream on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        # Dirty-rect frames are pixel-identical to full redraws and much cheaper
+        game = WoWBossSimulation(dirty_rects=True)
+        game.load_scenario(placements, params)
+        game.state = GameState.PLAYING
+        # Frames longer than the game's stall clamp (fps under 4) must still advance 1/fps
+        game.max_frame_time = float('inf')
+        if duration is None:
+            duration = game.core.get_fight_duration()
+        frame_count = int(round(duration * fps)) + 1
+        try:
+            for index in range(frame_count):
+                game.run_frame(0.0 if index == 0 else 1.0 / fps)
+                writer.submit(index, game.screen)
+        finally:
+            writer.close()
+            pygame.quit()
+    return frame_count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a fight to image files without a window")
+    parser.add_argument('scenario', help="Scenario JSON file with star placements and parameters")
+    parser.add_argument('-o', '--output', default='frames',
+                        help="Directory for PNG frames, or the raw stream file ('-' for stdout)")
+    parser.add_argument('--format', choices=['png', 'raw'], default='png',
+                        help="PNG sequence or a stream of packed RGB24 frames")
+    parser.add_argument('--fps', type=int, default=FPS)
+    parser.add_argument('--duration', type=float, help="Seconds to render (default: the whole fight)")
+    parser.add_argument('--workers', type=int, help="Encoding threads (default: based on CPU count)")
+    parser.add_argument('--compression', type=int, default=1, choices=range(0, 10),
+                        help="PNG zlib level; higher is smaller but slower")
+    args = parser.parse_args(argv)
+
+    placements, params = load_scenario(args.scenario)
+    start = time.perf_counter()
+    frames = export_frames(placements, params, args.output, args.format, args.fps,
+                           args.duration, args.workers, args.compression)
+    elapsed = time.perf_counter() - start
+    # Progress goes to stderr so a raw stream on stdout stays clean
+    print(f"Exported {frames} frames ({frames / args.fps:.1f}s of fight) in {elapsed:.1f}s "
+          f"({frames / args.fps / elapsed:.1f}x real time) to {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Compact session recordings and deterministic replay.
+
+A recording is a line-delimited JSON file: a header line with the starting
+parameters, then one line per event (star placed, parameter changed, pause,
+resume, rewind, reset). Every event carries the number of simulation ticks
+played so far and the simulation time it happened at, so a replay rebuilds
+the exact same SimulationCore without storing any per-frame state.
+
+    python wow_boss_sim.py --record session.jsonl
+    python wow_boss_sim.py --replay session.jsonl --replay-speed 4
+    python recording.py check session.jsonl other.jsonl --set rotation_speed=1.5
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from sim_core import FPS, SimulationCore, SimulationParams, StarPlacement
+from sim_analysis import HazardIndex
+
+RECORDING_VERSION = 1
+
+class SessionRecorder:
+    """Appends session events to a recording file as they happen"""
+    def __init__(self, path, params, tick_length=1.0 / FPS):
+        self.file = open(path, 'w')
+        self.ticks = 0  # Simulation ticks played so far
+        self.write({"version": RECORDING_VERSION, "tick": tick_length, "params": params.to_dict()})
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry, separators=(',', ':')) + "\n")
+
+    def tick(self):
+        self.ticks += 1
+
+    def record(self, event, t, **data):
+        self.write({"tick": self.ticks, "t": t, "event": event, **data})
+
+    def close(self, t):
+        """Marks the end of the session, so replays know how long it ran"""
+        self.record("end", t)
+        self.file.close()
+
+def load_recording(path):
+    """Reads a recording file, returning (header, events)"""
+    with open(path) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("version") != RECORDING_VERSION:
+        raise ValueError(f"{path} is not a version {RECORDING_VERSION} session recording")
+    return lines[0], lines[1:]
+
+class SessionReplay:
+    """Plays a recording back onto a fresh SimulationCore.
+
+    Replays move along the session clock: seconds of simulation played, with
+    pauses and rewinds taking no time. seek() to any clock position applies
+    every event up to it (restarting first when seeking backwards), and events
+    re-anchor the core at their recorded simulation time, so a replay ends in
+    the same state however it is stepped. `overrides` pins parameters to new
+    values for the whole replay, ignoring recorded changes to them, e.g. to
+    check a session against a rebalanced fight.
+    """
+    def __init__(self, header, events, overrides=None):
+        self.header = header
+        self.events = events
+        self.tick_length = header["tick"]
+        self.overrides = dict(overrides or {})
+        self.restart()
+
+    @classmethod
+    def load(cls, path, overrides=None):
+        return cls(*load_recording(path), overrides)
+
+    def restart(self):
+        params = SimulationParams.from_dict(self.header["params"])
+        for attr, value in self.overrides.items():
+            setattr(params, attr, value)
+        self.core = SimulationCore(params=params)
+        self.playing = False
+        self.index = 0  # Next event to apply
+        self.clock = 0.0
+        self.anchor_clock = 0.0  # Session clock and sim time of the last event
+        self.anchor_time = 0.0
+
+    def get_length(self):
+        """Session clock length in seconds"""
+        return self.events[-1]["tick"] * self.tick_length if self.events else 0.0
+
+    def is_finished(self):
+        return self.index >= len(self.events)
+
+    def get_time(self):
+        """Simulation time at the current session clock"""
+        if self.playing:
+            return self.anchor_time + (self.clock - self.anchor_clock)
+        return self.anchor_time
+
+    def seek(self, clock):
+        """Moves the session clock to `clock`, returning the events applied on the way"""
+        clock = max(0.0, min(self.get_length(), clock))
+        if clock < self.clock:
+            self.restart()
+        applied = []
+        while self.index < len(self.events) and self.events[self.index]["tick"] * self.tick_length <= clock:
+            event = self.events[self.index]
+            self.apply(event)
+            self.anchor_clock = event["tick"] * self.tick_length
+            self.anchor_time = self.core.time
+            applied.append(event)
+            self.index += 1
+        self.clock = clock
+        self.core.seek(self.get_time())
+        return applied
+
+    def run(self):
+        """Plays the whole session at once"""
+        return self.seek(self.get_length())
+
+    def apply(self, event):
+        kind = event["event"]
+        core = self.core
+        if kind == "reset":
+            self.core = SimulationCore(params=core.params, keyframe_capacity=core.keyframe_capacity)
+            self.playing = False
+            return
+        core.seek(event["t"])
+        if kind == "star":
+            core.add_star(StarPlacement(event["x"], event["y"], event["clockwise"]))
+        elif kind == "param":
+            if event["attr"] not in self.overrides:
+                core.set_param(event["attr"], event["value"])
+        elif kind == "resume":
+            self.playing = True
+        elif kind in ("pause", "rewind_start"):
+            self.playing = False
+        elif kind == "rewind":
+            core.seek(event["to"])
+        elif kind == "soft_reset":
+            core.reset()
+            self.playing = False
+        elif kind != "end":
+            raise ValueError(f"Unknown session event: {kind}")
+
+def get_min_safe_fraction(core, end_time):
+    """Smallest share of the arena left unhit by any damage sample up to end_time"""
+    hazards = HazardIndex(core, cell_size=8.0)
+    last = int(np.searchsorted(hazards.sample_ends, end_time, side='right'))
+    if last == 0:
+        return 1.0
+    hazards.ensure_samples(last)
+    hit = hazards.hits[:last].sum(axis=(1, 2))
+    return float(1.0 - hit.max() / hazards.inside.sum())
+
+def parse_override(text):
+    attr, _, value = text.partition("=")
+    if not hasattr(SimulationParams(), attr) or not value:
+        raise argparse.ArgumentTypeError(f"expected <parameter>=<value>, got {text!r}")
+    return attr, float(value)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay session recordings headlessly")
+    commands = parser.add_subparsers(dest='command', required=True)
+    check_parser = commands.add_parser('check', help="Replay recordings at full speed and report on them")
+    check_parser.add_argument('recordings', nargs='+')
+    check_parser.add_argument('--set', type=parse_override, action='append', default=[],
+                              metavar='PARAM=VALUE', help="Pin a parameter for the whole replay")
+    args = parser.parse_args(argv)
+
+    for path in args.recordings:
+        replay = SessionReplay.load(path, dict(args.set))
+        events = replay.run()
+        core = replay.core
+        print(f"{path}: {len(events)} events, {len(core.placements)} stars, "
+              f"ended at {core.time:.2f}s, min safe area {get_min_safe_fraction(core, core.time):.1%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
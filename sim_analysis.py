@@ -0,0 +1,761 @@
+"""Offline analysis of star placements, built on the headless core.
+
+Nothing here draws with pygame; everything is vectorized NumPy math over the
+arrays produced by SimulationCore.evaluate.
+"""
+import argparse
+import heapq
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from sim_core import (ARENA_CENTER_X, ARENA_CENTER_Y, ARENA_RADIUS, FPS,
+                      SimulationCore, SimulationParams, StarPlacement, ring_contains,
+                      load_scenario, save_scenario)
+
+DEFAULT_STAR_COUNT = 6
+DEFAULT_PLAYER_SPEED = 60.0  # Pixels per second
+SEARCH_TASK_SIZE = 16  # Placements scored per search task
+
+class CoverageMap:
+    """Per-cell damage exposure over an arena-sized grid.
+
+    `fraction[row, col]` is the fraction of the fight the cell spends inside a
+    ring during the damage phase. Cells outside the arena have `inside` False.
+    When computed with keep_samples=True, `hits[k, row, col]` records whether
+    the cell was hit at `sample_times[k]`, from which get_intervals recovers
+    hit intervals to within one sample (`time_step`).
+    """
+    def __init__(self, fraction, inside, origin, cell_size, duration,
+                 sample_times=None, sample_weights=None, hits=None):
+        self.fraction = fraction
+        self.inside = inside
+        self.origin = origin  # Window coordinates of the grid's top-left corner
+        self.cell_size = cell_size
+        self.duration = duration
+        self.sample_times = sample_times
+        self.sample_weights = sample_weights
+        self.hits = hits
+
+    @property
+    def shape(self):
+        return self.fraction.shape
+
+    def cell_at(self, x, y):
+        """(row, col) of the cell containing window point (x, y)"""
+        col = int((x - self.origin[0]) // self.cell_size)
+        row = int((y - self.origin[1]) // self.cell_size)
+        return row, col
+
+    def get_safe_fraction(self):
+        """Fraction of the arena that is never hit"""
+        return float(np.count_nonzero((self.fraction == 0) & self.inside) / np.count_nonzero(self.inside))
+
+    def get_intervals(self, row, col):
+        """Merged (start, end) times during which the cell is being hit"""
+        if self.hits is None:
+            raise ValueError("coverage was computed without keep_samples=True")
+        intervals = []
+        for t, weight, hit in zip(self.sample_times, self.sample_weights, self.hits[:, row, col]):
+            if not hit:
+                continue
+            start, end = t - weight / 2, t + weight / 2
+            if intervals and math.isclose(intervals[-1][1], start, abs_tol=1e-9):
+                intervals[-1] = (intervals[-1][0], end)
+            else:
+                intervals.append((start, end))
+        return intervals
+
+    def save(self, path):
+        """Writes the map to a NumPy .npz archive"""
+        arrays = {
+            'fraction': self.fraction,
+            'inside': self.inside,
+            'origin': np.array(self.origin, dtype=np.float64),
+            'cell_size': np.array(self.cell_size, dtype=np.float64),
+            'duration': np.array(self.duration, dtype=np.float64),
+        }
+        if self.hits is not None:
+            arrays['sample_times'] = self.sample_times
+            arrays['sample_weights'] = self.sample_weights
+            arrays['hits'] = self.hits
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['fraction'], data['inside'], tuple(data['origin']),
+                       float(data['cell_size']), float(data['duration']),
+                       data['sample_times'] if 'hits' in data else None,
+                       data['sample_weights'] if 'hits' in data else None,
+                       data['hits'] if 'hits' in data else None)
+
+def get_phase_sample_edges(params, duration, time_step):
+    """Per damage phase up to duration, the edges of equal samples at most time_step long.
+
+    Every analysis samples damage phases through this one layout, so their
+    answers line up sample for sample.
+    """
+    layout = []
+    for start, end in params.get_damage_windows(duration):
+        end = min(end, duration)
+        count = max(1, math.ceil((end - start) / time_step - 1e-9))
+        layout.append(start + (end - start) * np.arange(count + 1) / count)
+    return layout
+
+def get_damage_samples(params, duration, time_step):
+    """Midpoint sample times (and the time each stands for) covering every damage phase"""
+    layout = get_phase_sample_edges(params, duration, time_step)
+    if not layout:
+        return np.zeros(0), np.zeros(0)
+    times = np.concatenate([(edges[:-1] + edges[1:]) / 2 for edges in layout])
+    weights = np.concatenate([np.diff(edges) for edges in layout])
+    return times, weights
+
+def rasterize_rings(core, times, grid_x, grid_y, inside):
+    """(T, rows, cols) number of rings covering each arena cell at each time"""
+    batch = core.evaluate_rings(times)
+    # (T, R, rows, cols) distances from every cell to every ring
+    dx = grid_x[None, None] - batch.x[:, :, None, None]
+    dy = grid_y[None, None] - batch.y[:, :, None, None]
+    on_ring = ring_contains(np.hypot(dx, dy), batch.radius[:, :, None, None],
+                            batch.width[:, :, None, None])
+    return on_ring.sum(axis=1, dtype=np.int32) * inside
+
+def get_arena_grid(cell_size):
+    """Cell-center coordinates of a grid covering the arena's bounding box"""
+    cells = int(math.ceil(2 * ARENA_RADIUS / cell_size))
+    origin = (ARENA_CENTER_X - cells * cell_size / 2, ARENA_CENTER_Y - cells * cell_size / 2)
+    centers = (np.arange(cells) + 0.5) * cell_size
+    grid_x, grid_y = np.meshgrid(origin[0] + centers, origin[1] + centers)
+    inside = np.hypot(grid_x - ARENA_CENTER_X, grid_y - ARENA_CENTER_Y) <= ARENA_RADIUS
+    return grid_x, grid_y, inside, origin
+
+def compute_coverage(placements, params=None, duration=None, cell_size=4.0,
+                     time_step=0.05, keep_samples=False, chunk_size=32):
+    """Rasterizes damage-phase ring coverage for a placement over a whole fight.
+
+    `duration` defaults to the time after which no ring can reach the arena.
+    Only damage phases are sampled, `time_step` apart.
+    """
+    core = SimulationCore(placements, params)
+    if duration is None:
+        duration = core.get_fight_duration()
+    grid_x, grid_y, inside, origin = get_arena_grid(cell_size)
+    times, weights = get_damage_samples(core.params, duration, time_step)
+
+    exposure = np.zeros(grid_x.shape, dtype=np.float64)
+    hits = np.zeros((len(times),) + grid_x.shape, dtype=bool) if keep_samples else None
+    for start in range(0, len(times), chunk_size):
+        on_ring = rasterize_rings(core, times[start:start + chunk_size], grid_x, grid_y, inside) > 0
+        exposure += np.tensordot(weights[start:start + chunk_size], on_ring, axes=1)
+        if keep_samples:
+            hits[start:start + len(on_ring)] = on_ring
+
+    fraction = exposure / duration if duration > 0 else exposure
+    return CoverageMap(fraction, inside, origin, cell_size, duration,
+                       times if keep_samples else None,
+                       weights if keep_samples else None,
+                       hits)
+
+def get_min_safe_area(coverage):
+    """Smallest fraction of the arena left unhit at any moment of damage"""
+    inside = np.count_nonzero(coverage.inside)
+    if len(coverage.hits) == 0:
+        return 1.0
+    hit_cells = coverage.hits.reshape(len(coverage.hits), -1).sum(axis=1)
+    return float(1.0 - hit_cells.max() / inside)
+
+def get_longest_safe_window(coverage):
+    """Average over arena cells of the longest time each goes unhit, in seconds"""
+    last_hit = np.zeros(coverage.shape)
+    longest = np.zeros(coverage.shape)
+    for t, weight, hit in zip(coverage.sample_times, coverage.sample_weights, coverage.hits):
+        start = t - weight / 2
+        longest = np.where(hit, np.maximum(longest, start - last_hit), longest)
+        last_hit = np.where(hit, t + weight / 2, last_hit)
+    longest = np.maximum(longest, coverage.duration - last_hit)
+    return float(longest[coverage.inside].mean())
+
+SCORE_METRICS = {
+    'min_safe_area': get_min_safe_area,
+    'safe_window': get_longest_safe_window,
+}
+
+def score_placement(placements, params, metric='min_safe_area', cell_size=10.0, time_step=0.1):
+    """Scores a placement with one of SCORE_METRICS; higher is better"""
+    coverage = compute_coverage(placements, params, cell_size=cell_size,
+                                time_step=time_step, keep_samples=True)
+    return SCORE_METRICS[metric](coverage)
+
+def sample_placement(rng, params, star_count=DEFAULT_STAR_COUNT):
+    """Random valid placement, following the same rules as clicking in the game"""
+    # Stars must be strictly inside ARENA_RADIUS - star_radius of the center
+    max_distance = ARENA_RADIUS - params.get_star_radius()
+    distance = max_distance * np.sqrt(rng.uniform(0.0, 1.0, star_count)) * (1 - 1e-9)
+    angle = rng.uniform(-math.pi, math.pi, star_count)
+    # First half turn clockwise, the rest counter-clockwise
+    return [StarPlacement(ARENA_CENTER_X + d * math.cos(a), ARENA_CENTER_Y + d * math.sin(a),
+                          i < star_count // 2)
+            for i, (d, a) in enumerate(zip(distance, angle))]
+
+def _search_worker(seed, count, params, star_count, metric, top_k):
+    rng = np.random.default_rng(seed)
+    scored = []
+    for _ in range(count):
+        placements = sample_placement(rng, params, star_count)
+        score = score_placement(placements, params, metric)
+        scored.append((score, [(p.x, p.y, p.clockwise) for p in placements]))
+    return heapq.nlargest(top_k, scored, key=lambda item: item[0])
+
+def search_placements(samples=1000, top_k=10, params=None, metric='min_safe_area',
+                      star_count=DEFAULT_STAR_COUNT, seed=None, workers=None):
+    """Monte Carlo search for the best placements, scored across a process pool.
+
+    Returns the top_k (score, placements) pairs, best first. Results only
+    depend on `seed`, not on the number of workers.
+    """
+    if metric not in SCORE_METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    params = params if params is not None else SimulationParams()
+    workers = workers or os.cpu_count() or 1
+
+    # Fixed-size tasks, each with its own child seed; the split must not
+    # depend on the worker count, or the same seed would search differently
+    counts = [min(SEARCH_TASK_SIZE, samples - start) for start in range(0, samples, SEARCH_TASK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+
+    if workers == 1:
+        results = [_search_worker(s, c, params, star_count, metric, top_k) for s, c in zip(seeds, counts)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_search_worker, seeds, counts,
+                                    [params] * len(counts), [star_count] * len(counts),
+                                    [metric] * len(counts), [top_k] * len(counts)))
+
+    best = heapq.nlargest(top_k, (item for result in results for item in result), key=lambda item: item[0])
+    return [(score, [StarPlacement(x, y, clockwise) for x, y, clockwise in stars]) for score, stars in best]
+
+class PlayerPaths:
+    """Positions of P players over time, linearly interpolated between waypoints.
+
+    `times` has shape (K,) and `positions` (P, K, 2). A single waypoint means
+    the players stand still.
+    """
+    def __init__(self, times, positions):
+        self.times = np.asarray(times, dtype=np.float64).reshape(-1)
+        self.positions = np.asarray(positions, dtype=np.float64)
+        if self.positions.ndim != 3 or self.positions.shape[1:] != (len(self.times), 2):
+            raise ValueError("positions must have shape (players, len(times), 2)")
+
+    @classmethod
+    def static(cls, points):
+        points = np.asarray(points, dtype=np.float64)
+        return cls([0.0], points[:, None, :])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['times'], data['positions'])
+
+    def __len__(self):
+        return len(self.positions)
+
+    def get_positions(self, t):
+        """(P, 2) positions at time t, held at the first/last waypoint outside the path"""
+        if len(self.times) == 1:
+            return self.positions[:, 0]
+        i = int(np.clip(np.searchsorted(self.times, t, side='right') - 1, 0, len(self.times) - 2))
+        span = self.times[i + 1] - self.times[i]
+        fraction = np.clip((t - self.times[i]) / span, 0.0, 1.0) if span > 0 else 0.0
+        return self.positions[:, i] + (self.positions[:, i + 1] - self.positions[:, i]) * fraction
+
+def sample_players(rng, count):
+    """Random standing positions spread uniformly over the arena"""
+    distance = ARENA_RADIUS * np.sqrt(rng.uniform(0.0, 1.0, count))
+    angle = rng.uniform(-math.pi, math.pi, count)
+    return np.column_stack([ARENA_CENTER_X + distance * np.cos(angle),
+                            ARENA_CENTER_Y + distance * np.sin(angle)])
+
+class PlayerGrid:
+    """Uniform-grid spatial hash over player positions.
+
+    Players are sorted by cell once, so the players of any cell are a
+    contiguous slice of `order`. Ring queries only visit cells the ring's band
+    can overlap.
+    """
+    def __init__(self, positions, cell_size=32.0):
+        self.positions = positions
+        self.cell_size = cell_size
+        self.origin = positions.min(axis=0) if len(positions) else np.zeros(2)
+        cells = np.floor((positions - self.origin) / cell_size).astype(np.int64)
+        self.columns = int(cells[:, 0].max()) + 1 if len(positions) else 1
+        self.rows = int(cells[:, 1].max()) + 1 if len(positions) else 1
+        cell_ids = cells[:, 1] * self.columns + cells[:, 0]
+        self.order = np.argsort(cell_ids, kind='stable')
+        self.cell_starts = np.searchsorted(cell_ids[self.order], np.arange(self.rows * self.columns + 1))
+
+    def query_ring(self, x, y, radius, width):
+        """Indices of players on the band of width `width` inward from `radius`"""
+        size = self.cell_size
+        inner = radius - width
+        col_range = np.arange(max(0, int((x - radius - self.origin[0]) // size)),
+                              min(self.columns, int((x + radius - self.origin[0]) // size) + 1))
+        row_range = np.arange(max(0, int((y - radius - self.origin[1]) // size)),
+                              min(self.rows, int((y + radius - self.origin[1]) // size) + 1))
+        if len(col_range) == 0 or len(row_range) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # Keep cells whose nearest point is inside the ring and farthest point beyond its inner edge
+        cols, rows = np.meshgrid(col_range, row_range)
+        left = self.origin[0] + cols * size
+        top = self.origin[1] + rows * size
+        near_x = np.clip(x, left, left + size) - x
+        near_y = np.clip(y, top, top + size) - y
+        far_x = np.maximum(np.abs(left - x), np.abs(left + size - x))
+        far_y = np.maximum(np.abs(top - y), np.abs(top + size - y))
+        # A band wider than the radius reaches the center, so every cell clears its inner edge
+        overlaps = ((near_x ** 2 + near_y ** 2 <= radius ** 2)
+                    & (far_x ** 2 + far_y ** 2 > np.maximum(inner, 0.0) ** 2))
+        cell_ids = (rows * self.columns + cols)[overlaps]
+        if len(cell_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = np.concatenate([self.order[self.cell_starts[c]:self.cell_starts[c + 1]] for c in cell_ids])
+        offsets = self.positions[candidates] - (x, y)
+        return candidates[ring_contains(np.hypot(offsets[:, 0], offsets[:, 1]), radius, width)]
+
+class DamageLog:
+    """Every time a player was hit, as parallel arrays.
+
+    One entry per (player, damage phase, star): a ring hits a player at most
+    once per damage phase, at the first sampled moment they are on it.
+    """
+    def __init__(self, player_count, player, star, phase, time):
+        self.player_count = player_count
+        self.player = player
+        self.star = star
+        self.phase = phase  # Index into SimulationParams.get_damage_windows()
+        self.time = time
+
+    def __len__(self):
+        return len(self.player)
+
+    def get_hit_counts(self):
+        return np.bincount(self.player, minlength=self.player_count)
+
+    def for_player(self, index):
+        """(time, star, phase) of every hit on one player, in time order"""
+        mask = self.player == index
+        return list(zip(self.time[mask].tolist(), self.star[mask].tolist(), self.phase[mask].tolist()))
+
+    def save(self, path):
+        """Writes the log as CSV, one hit per row"""
+        with open(path, 'w') as f:
+            f.write("player,star,phase,time\n")
+            for player, star, phase, t in zip(self.player, self.star, self.phase, self.time):
+                f.write(f"{player},{star},{phase},{t:.4f}\n")
+
+def detect_hits(placements, params, players, duration=None, time_step=0.05, cell_size=32.0,
+                brute_force=False):
+    """Works out which players each ring hits during every damage phase.
+
+    `players` is a PlayerPaths (or an array of static (x, y) points). Players
+    are indexed with a PlayerGrid at every damage sample, so each ring only
+    tests the players near its band. `brute_force` tests every player against
+    every ring instead, to check the grid against.
+    """
+    if not isinstance(players, PlayerPaths):
+        players = PlayerPaths.static(players)
+    core = SimulationCore(placements, params)
+    if duration is None:
+        duration = core.get_fight_duration()
+
+    entries = {}  # (player, star, phase) -> first hit time
+    static_grid = PlayerGrid(players.positions[:, 0], cell_size) if len(players.times) == 1 else None
+    for phase, edges in enumerate(get_phase_sample_edges(core.params, duration, time_step)):
+        times = (edges[:-1] + edges[1:]) / 2
+        batch = core.evaluate_rings(times)
+        for k, t in enumerate(times):
+            grid = static_grid or PlayerGrid(players.get_positions(t), cell_size)
+            for ring in np.flatnonzero(batch.radius[k] > 0):
+                if brute_force:
+                    offsets = grid.positions - (batch.x[k, ring], batch.y[k, ring])
+                    hit = np.flatnonzero(ring_contains(np.hypot(offsets[:, 0], offsets[:, 1]),
+                                                       batch.radius[k, ring], batch.width[k, ring]))
+                else:
+                    hit = grid.query_ring(batch.x[k, ring], batch.y[k, ring],
+                                          batch.radius[k, ring], batch.width[k, ring])
+                # A star's waves and its own ring count as one hit per phase
+                star = int(batch.star[ring])
+                for player in hit.tolist():
+                    entries.setdefault((player, star, phase), float(t))
+
+    keys = sorted(entries, key=lambda key: (entries[key], key))
+    return DamageLog(len(players),
+                     np.array([key[0] for key in keys], dtype=np.int64),
+                     np.array([key[1] for key in keys], dtype=np.int64),
+                     np.array([key[2] for key in keys], dtype=np.int64),
+                     np.array([entries[key] for key in keys], dtype=np.float64))
+
+class HazardIndex:
+    """Precomputed answers to "is point P hit at time t / during [t0, t1]".
+
+    The fight's damage phases are sampled `time_step` apart and each sample is
+    rasterized onto an arena grid of `cell_size` cells, as in the coverage map.
+    A cumulative count over samples turns a window query into two lookups, so
+    point and window queries cost O(log samples) and are vectorized over
+    arrays of queries.
+
+    Samples are built lazily, one damage phase at a time, the first time a
+    query needs them. invalidate_param() only throws away the phases a
+    parameter change can affect, so they are rebuilt on demand.
+    """
+    def __init__(self, core, cell_size=4.0, time_step=0.05):
+        self.core = core
+        self.cell_size = cell_size
+        self.time_step = time_step
+        self.grid_x, self.grid_y, self.inside, self.origin = get_arena_grid(cell_size)
+        self.rebuild()
+
+    def rebuild(self):
+        """Lays out samples for the current parameters, discarding everything built"""
+        self.duration = self.core.get_fight_duration()
+        self.windows = self.core.params.get_damage_windows(self.duration)
+        starts, ends, phases = [], [], []
+        for phase, edges in enumerate(get_phase_sample_edges(self.core.params, self.duration, self.time_step)):
+            starts.extend(edges[:-1])
+            ends.extend(edges[1:])
+            phases.extend([phase] * (len(edges) - 1))
+        self.sample_starts = np.array(starts, dtype=np.float64)
+        self.sample_ends = np.array(ends, dtype=np.float64)
+        self.sample_phases = np.array(phases, dtype=np.int64)
+        self.phase_offsets = np.searchsorted(self.sample_phases, np.arange(len(self.windows) + 1))
+        self.hits = np.zeros((len(starts),) + self.grid_x.shape, dtype=bool)
+        self.built = np.zeros(len(self.windows), dtype=bool)
+        self.prefix = np.zeros((len(starts) + 1,) + self.grid_x.shape, dtype=np.int32)
+        self.prefix_valid_until = 0  # prefix[:n + 1] is up to date for n samples
+
+    def invalidate_param(self, attr, t=0.0):
+        """Forgets the damage phases that changing `attr` at time t can affect"""
+        windows = self.core.params.get_damage_windows(self.core.get_fight_duration())
+        if windows != self.windows:
+            # Timing or fight length changed: the sample layout itself moves
+            self.rebuild()
+        else:
+            first = self.core.get_param_change_start(attr, t)
+            self.invalidate_phases(np.array([end > first for start, end in self.windows], dtype=bool))
+
+    def invalidate_phases(self, stale):
+        self.built &= ~stale
+        if stale.any():
+            first = self.phase_offsets[np.argmax(stale)]
+            self.prefix_valid_until = min(self.prefix_valid_until, first)
+
+    def build_phase(self, phase):
+        lo, hi = self.phase_offsets[phase], self.phase_offsets[phase + 1]
+        times = (self.sample_starts[lo:hi] + self.sample_ends[lo:hi]) / 2
+        self.hits[lo:hi] = rasterize_rings(self.core, times, self.grid_x, self.grid_y, self.inside) > 0
+        self.built[phase] = True
+        self.prefix_valid_until = min(self.prefix_valid_until, lo)
+
+    def ensure_samples(self, last):
+        """Builds samples [0, last) where stale and brings their cumulative counts up to date"""
+        start = self.prefix_valid_until
+        if last <= start:
+            return
+        for phase in range(self.sample_phases[start], self.sample_phases[last - 1] + 1):
+            if not self.built[phase]:
+                self.build_phase(phase)
+        self.prefix[start + 1:last + 1] = self.prefix[start] + np.cumsum(self.hits[start:last], axis=0)
+        self.prefix_valid_until = last
+
+    def get_cells(self, x, y):
+        """Grid (row, col) of each point, and whether the point is on the grid"""
+        col = np.floor((np.asarray(x, dtype=np.float64) - self.origin[0]) / self.cell_size).astype(np.int64)
+        row = np.floor((np.asarray(y, dtype=np.float64) - self.origin[1]) / self.cell_size).astype(np.int64)
+        rows, cols = self.grid_x.shape
+        on_grid = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+        return np.clip(row, 0, rows - 1), np.clip(col, 0, cols - 1), on_grid
+
+    def is_point_safe(self, x, y, t):
+        """Whether each point (x, y) is off every damaging ring at time t"""
+        x, y, t = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64),
+                                      np.asarray(t, dtype=np.float64))
+        if len(self.sample_starts) == 0:
+            return np.ones(x.shape, dtype=bool)
+        k = np.clip(np.searchsorted(self.sample_starts, t, side='right') - 1, 0, None)
+        in_sample = (t >= self.sample_starts[k]) & (t < self.sample_ends[k])
+        if in_sample.any():
+            needed = np.unique(self.sample_phases[k[in_sample]])
+            for phase in needed[~self.built[needed]]:
+                self.build_phase(phase)
+        row, col, on_grid = self.get_cells(x, y)
+        return ~(in_sample & on_grid & self.hits[k, row, col])
+
+    def is_window_safe(self, x, y, t0, t1):
+        """Whether each point (x, y) stays off every damaging ring for all of [t0, t1)"""
+        x, y, t0, t1 = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (x, y, t0, t1)))
+        first = np.searchsorted(self.sample_ends, t0, side='right')
+        last = np.maximum(np.searchsorted(self.sample_starts, t1, side='left'), first)
+        if last.size:
+            self.ensure_samples(int(last.max()))
+        row, col, on_grid = self.get_cells(x, y)
+        hit_count = self.prefix[last, row, col] - self.prefix[first, row, col]
+        return ~on_grid | (hit_count == 0)
+
+class ExposureTracker:
+    """Live damage exposure: seconds each arena cell has spent under a damage-phase ring.
+
+    Exposure is summed one fixed tick at a time, sampling each tick at its
+    midpoint, so it only depends on how many ticks have been played and
+    seek() gives the same grid however the fight got there. A ring's cells
+    are worked out once and reused for every tick it does not move or grow,
+    which covers waves and stars that have not started rotating. Snapshots every `checkpoint_ticks` make seeking back a
+    restore plus at most that many ticks.
+    """
+    def __init__(self, core, cell_size=10.0, tick_length=1.0 / FPS, checkpoint_ticks=60):
+        self.core = core
+        self.cell_size = cell_size
+        self.tick_length = tick_length
+        self.checkpoint_ticks = checkpoint_ticks
+        self.grid_x, self.grid_y, self.inside, self.origin = get_arena_grid(cell_size)
+        self.seconds = np.zeros(self.grid_x.shape, dtype=np.float64)
+        self.ticks = 0  # Ticks summed into `seconds`
+        self.checkpoints = [self.seconds.copy()]  # Exposure after every checkpoint_ticks ticks
+        self.stamps = {}  # (x, y, radius, width) -> grid of the cells on the ring
+        self.version = 0  # Bumped whenever `seconds` changes
+
+    def step(self):
+        """Sums one more tick into the exposure"""
+        t = (self.ticks + 0.5) * self.tick_length
+        self.ticks += 1
+        if self.core.get_phase(t) != "damage":
+            return
+        pool = self.core.get_rings(t)
+        keys = list(zip(pool.x.tolist(), pool.y.tolist(), pool.radius.tolist(), pool.width.tolist()))
+        # Keep only the stamps of rings still around, and work out new ones together
+        stamps = {key: self.stamps[key] for key in keys if key in self.stamps}
+        missing = [key for key in dict.fromkeys(keys) if key not in stamps]
+        if missing:
+            x, y, radius, width = (np.array(values)[:, None, None] for values in zip(*missing))
+            # Several times faster than np.hypot, and this runs every damage tick
+            distance = np.sqrt((self.grid_x - x) ** 2 + (self.grid_y - y) ** 2)
+            cells = ring_contains(distance, radius, width) & self.inside
+            stamps.update(zip(missing, cells))
+        self.stamps = stamps
+        if keys:
+            self.seconds[np.any([stamps[key] for key in keys], axis=0)] += self.tick_length
+        self.version += 1
+
+    def seek(self, t, max_ticks=None):
+        """Brings the exposure to time t (rounded down to a whole tick).
+
+        With `max_ticks`, sums at most that many ticks towards t, so a long
+        catch-up can be spread over several calls. Returns whether t was reached.
+        """
+        target = max(0, int(math.floor(t / self.tick_length + 1e-9)))
+        checkpoint = min(target // self.checkpoint_ticks, len(self.checkpoints) - 1)
+        if target < self.ticks or checkpoint * self.checkpoint_ticks > self.ticks:
+            self.restore(checkpoint)
+        end = target if max_ticks is None else min(target, self.ticks + max_ticks)
+        while self.ticks < end:
+            self.step()
+            if self.ticks == len(self.checkpoints) * self.checkpoint_ticks:
+                self.checkpoints.append(self.seconds.copy())
+        return self.ticks == target
+
+    def restore(self, checkpoint):
+        self.seconds = self.checkpoints[checkpoint].copy()
+        self.ticks = checkpoint * self.checkpoint_ticks
+        self.version += 1
+
+    def invalidate_param(self, attr, t=0.0):
+        """Forgets the exposure that changing `attr` at time t can affect"""
+        first = int(math.floor(self.core.get_param_change_start(attr, t) / self.tick_length + 1e-9))
+        del self.checkpoints[first // self.checkpoint_ticks + 1:]
+        if self.ticks > first:
+            self.restore(len(self.checkpoints) - 1)
+
+class DodgePlan:
+    """A planned path through the fight: where to stand at each planner step.
+
+    `exposure` is the time spent standing in damaging rings, counted once per
+    ring, so 0 means the path takes no damage.
+    """
+    def __init__(self, times, positions, exposure):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.positions = np.asarray(positions, dtype=np.float64)
+        self.exposure = float(exposure)
+
+    def is_safe(self):
+        return self.exposure == 0
+
+    def to_player_paths(self):
+        return PlayerPaths(self.times, self.positions[None])
+
+    def get_position(self, t):
+        return self.to_player_paths().get_positions(t)[0]
+
+    def save(self, path):
+        """Saves as a PlayerPaths .npz, so `hits --paths` can check it"""
+        np.savez_compressed(path, times=self.times, positions=self.positions[None],
+                            exposure=self.exposure)
+
+def plan_dodge_path(core, start, speed=DEFAULT_PLAYER_SPEED, start_time=0.0, end_time=None,
+                    cell_size=8.0, time_step=0.05, workers=None, chunk_size=32):
+    """Path from `start` through the rest of the fight that takes the least damage.
+
+    Dynamic programming over a time-expanded arena grid: each step the player
+    may stay or move up to `speed` to a nearby cell, and standing in a cell
+    costs the damaging rings over it for that step. The step length is picked
+    so a move covers a whole number of cells, and each step checks ring
+    coverage every `time_step`. Ring coverage for all steps is computed first,
+    with chunks of time slices spread over a thread pool.
+    """
+    if end_time is None:
+        end_time = core.get_fight_duration()
+    grid_x, grid_y, inside, origin = get_arena_grid(cell_size)
+    rows, cols = grid_x.shape
+    start_row = int((start[1] - origin[1]) // cell_size)
+    start_col = int((start[0] - origin[0]) // cell_size)
+    if not (0 <= start_row < rows and 0 <= start_col < cols and inside[start_row, start_col]):
+        raise ValueError("start position is outside the arena")
+
+    reach = max(1, round(speed * time_step / cell_size))
+    step = reach * cell_size / speed
+    step_count = max(1, math.ceil((end_time - start_time) / step - 1e-9))
+    times = start_time + step * np.arange(step_count + 1)
+    substeps = max(1, math.ceil(step / time_step - 1e-9))
+    # Coverage sampled along (times[k - 1], times[k]] is charged to step k
+    sample_times = (times[:-1, None] + step * (np.arange(substeps) + 1) / substeps).reshape(-1)
+
+    # Only damage-phase samples can cost anything
+    counts = np.zeros((len(sample_times), rows, cols), dtype=np.int32)
+    damage = np.flatnonzero([core.params.get_phase(t) == "damage" for t in sample_times])
+    chunks = range(0, len(damage), chunk_size)
+    def fill(first):
+        indices = damage[first:first + chunk_size]
+        counts[indices] = rasterize_rings(core, sample_times[indices], grid_x, grid_y, inside)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(fill, chunks))
+    cost = counts.reshape(step_count, substeps, rows, cols).max(axis=1) * step
+
+    # Staying put comes first, so ties keep the player still
+    moves = sorted(((dy, dx) for dy in range(-reach, reach + 1) for dx in range(-reach, reach + 1)
+                    if dy * dy + dx * dx <= reach * reach), key=lambda m: (m != (0, 0), m))
+    best = np.full((rows, cols), np.inf)
+    best[start_row, start_col] = 0.0
+    choices = np.zeros((step_count, rows, cols), dtype=np.int16)
+    for k in range(step_count):
+        padded = np.pad(best, reach, constant_values=np.inf)
+        total = np.full((rows, cols), np.inf)
+        for i, (dy, dx) in enumerate(moves):
+            # Best cost of arriving from the cell (dy, dx) away
+            came_from = padded[reach - dy:reach - dy + rows, reach - dx:reach - dx + cols]
+            better = came_from < total
+            total[better] = came_from[better]
+            choices[k][better] = i
+        best = np.where(inside, total + cost[k], np.inf)
+
+    row, col = np.unravel_index(np.argmin(best), best.shape)
+    exposure = best[row, col]
+    cells = [(row, col)]
+    for k in range(step_count - 1, -1, -1):
+        dy, dx = moves[choices[k, row, col]]
+        row, col = row - dy, col - dx
+        cells.append((row, col))
+    cells.reverse()
+    positions = np.array([(grid_x[r, c], grid_y[r, c]) for r, c in cells])
+    positions[0] = start
+    return DodgePlan(times, positions, exposure)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline analysis of star placements")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    coverage_parser = commands.add_parser('coverage', help="Export a damage coverage grid")
+    coverage_parser.add_argument('scenario', help="Scenario JSON file")
+    coverage_parser.add_argument('-o', '--output', default='coverage.npz')
+    coverage_parser.add_argument('--cell-size', type=float, default=4.0)
+    coverage_parser.add_argument('--intervals', action='store_true',
+                                 help="Also store per-sample hits, for hit intervals")
+
+    search_parser = commands.add_parser('search', help="Monte Carlo search for good placements")
+    search_parser.add_argument('--samples', type=int, default=1000)
+    search_parser.add_argument('--top', type=int, default=5)
+    search_parser.add_argument('--metric', choices=sorted(SCORE_METRICS), default='min_safe_area')
+    search_parser.add_argument('--stars', type=int, default=DEFAULT_STAR_COUNT)
+    search_parser.add_argument('--seed', type=int)
+    search_parser.add_argument('--workers', type=int, help="Defaults to one per CPU core")
+    search_parser.add_argument('--params', help="Scenario JSON file to take parameters from")
+    search_parser.add_argument('--out-dir', default='.')
+
+    hits_parser = commands.add_parser('hits', help="Per-player damage log for a scenario")
+    hits_parser.add_argument('scenario', help="Scenario JSON file")
+    hits_parser.add_argument('--players', type=int, default=200,
+                             help="Number of random standing players (ignored with --paths)")
+    hits_parser.add_argument('--paths', help=".npz file with 'times' (K,) and 'positions' (P, K, 2)")
+    hits_parser.add_argument('--seed', type=int)
+    hits_parser.add_argument('-o', '--output', default='damage_log.csv')
+    hits_parser.add_argument('--check', action='store_true',
+                             help="Compare against a brute-force all-pairs test; exits 1 on mismatch")
+
+    plan_parser = commands.add_parser('plan', help="Least-damage dodge path for a scenario")
+    plan_parser.add_argument('scenario', help="Scenario JSON file")
+    plan_parser.add_argument('--start', type=float, nargs=2, metavar=('X', 'Y'),
+                             default=(ARENA_CENTER_X, ARENA_CENTER_Y))
+    plan_parser.add_argument('--speed', type=float, default=DEFAULT_PLAYER_SPEED,
+                             help="Movement speed in pixels per second")
+    plan_parser.add_argument('--cell-size', type=float, default=8.0)
+    plan_parser.add_argument('--workers', type=int)
+    plan_parser.add_argument('-o', '--output', default='dodge_path.npz')
+
+    args = parser.parse_args(argv)
+    if args.command == 'coverage':
+        placements, params = load_scenario(args.scenario)
+        coverage = compute_coverage(placements, params, cell_size=args.cell_size,
+                                    keep_samples=args.intervals)
+        coverage.save(args.output)
+        print(f"Safe area {coverage.get_safe_fraction():.1%}, saved to {args.output}")
+    elif args.command == 'search':
+        params = load_scenario(args.params)[1] if args.params else SimulationParams()
+        results = search_placements(args.samples, args.top, params, args.metric,
+                                    args.stars, args.seed, args.workers)
+        os.makedirs(args.out_dir, exist_ok=True)
+        for rank, (score, placements) in enumerate(results, 1):
+            path = os.path.join(args.out_dir, f"placement_{rank}.json")
+            save_scenario(path, placements, params)
+            print(f"#{rank} {args.metric}={score:.4f} -> {path}")
+    elif args.command == 'hits':
+        placements, params = load_scenario(args.scenario)
+        if args.paths:
+            players = PlayerPaths.load(args.paths)
+        else:
+            players = PlayerPaths.static(sample_players(np.random.default_rng(args.seed), args.players))
+        log = detect_hits(placements, params, players)
+        log.save(args.output)
+        counts = log.get_hit_counts()
+        print(f"{len(log)} hits on {len(players)} players ({np.count_nonzero(counts == 0)} never hit), "
+              f"saved to {args.output}")
+        if args.check:
+            expected = detect_hits(placements, params, players, brute_force=True)
+            found, wanted = (set(zip(l.player.tolist(), l.star.tolist(), l.phase.tolist(), l.time.tolist()))
+                             for l in (log, expected))
+            if found != wanted:
+                parser.exit(1, f"Grid disagrees with brute force: {len(wanted - found)} missed, "
+                               f"{len(found - wanted)} extra\n")
+            print(f"Matches a brute-force all-pairs check ({len(wanted)} hits)")
+    elif args.command == 'plan':
+        placements, params = load_scenario(args.scenario)
+        plan = plan_dodge_path(SimulationCore(placements, params), args.start, args.speed,
+                               cell_size=args.cell_size, workers=args.workers)
+        plan.save(args.output)
+        status = "safe" if plan.is_safe() else f"{plan.exposure:.2f}s in damaging rings"
+        print(f"Planned {len(plan.times)} steps over {plan.times[-1]:.1f}s ({status}), "
+              f"saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
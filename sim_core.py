@@ -0,0 +1,492 @@
+"""Headless simulation core for the WoW boss fight.
+
+Everything in here is pure computation: no pygame, no display, no fonts and
+no wall clock. State is a function of simulation time, so encounters can be
+evaluated faster than real time on machines without a display.
+"""
+import json
+import math
+
+import numpy as np
+
+# Constants
+WINDOW_WIDTH = 1194  # Match plan.png width
+WINDOW_HEIGHT = 671  # Match plan.png height
+ARENA_CENTER_X = WINDOW_WIDTH // 2
+ARENA_CENTER_Y = WINDOW_HEIGHT // 2
+ARENA_RADIUS = 300  # Adjusted for new window size
+FPS = 60
+
+# Default adjustable parameters
+DEFAULT_STAR_SIZE = 0.090  # Multiplier of arena radius
+DEFAULT_RING_WIDTH = 1.1  # Multiplier of star radius
+DEFAULT_ROTATION_SPEED = 0.2  # Radians per second
+DEFAULT_RING_START_OFFSET = 3.0  # Multiplier of star radius
+DEFAULT_RING_SPACING = 2.5  # Multiplier of star radius
+
+# Ring timing
+DEFAULT_WARNING_DURATION = 2.0  # Seconds of warning phase per cycle
+DEFAULT_DAMAGE_DURATION = 0.5  # Seconds of damage phase per cycle
+DEFAULT_EXPANSION_INTERVAL = 3.0  # Ring moves to its next position this often
+
+# Waves: rings a star leaves behind where it was, on top of its own ring
+DEFAULT_EMISSION_INTERVAL = 0  # Expansion levels between waves, 0 for none
+DEFAULT_WAVE_LIFETIME = 4  # Expansion levels a wave lasts
+
+class SimulationParams:
+    def __init__(self):
+        self.star_size = DEFAULT_STAR_SIZE
+        self.ring_width = DEFAULT_RING_WIDTH
+        self.rotation_speed = DEFAULT_ROTATION_SPEED
+        self.ring_start_offset = DEFAULT_RING_START_OFFSET
+        self.ring_spacing = DEFAULT_RING_SPACING
+        self.warning_duration = DEFAULT_WARNING_DURATION
+        self.damage_duration = DEFAULT_DAMAGE_DURATION
+        self.expansion_interval = DEFAULT_EXPANSION_INTERVAL
+        self.emission_interval = DEFAULT_EMISSION_INTERVAL
+        self.wave_lifetime = DEFAULT_WAVE_LIFETIME
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, values):
+        params = cls()
+        for attr, value in values.items():
+            if not hasattr(params, attr):
+                raise ValueError(f"Unknown simulation parameter: {attr}")
+            setattr(params, attr, float(value))
+        return params
+
+    def get_star_radius(self):
+        return ARENA_RADIUS * self.star_size
+
+    def get_ring_width(self):
+        return self.get_star_radius() * self.ring_width
+
+    def get_cycle_duration(self):
+        return self.warning_duration + self.damage_duration
+
+    def get_expansion_level(self, elapsed):
+        """How many times a ring has expanded after `elapsed` seconds"""
+        return max(0, int(elapsed / self.expansion_interval))
+
+    def get_ring_radius(self, expansion_level):
+        # Each expansion adds more distance
+        star_radius = self.get_star_radius()
+        return star_radius * (self.ring_start_offset + expansion_level * self.ring_spacing)
+
+    def get_wave_slots(self):
+        """Most waves one star can have alive at once"""
+        interval = int(self.emission_interval)
+        if interval <= 0 or self.wave_lifetime < 1:
+            return 0
+        return math.ceil(int(self.wave_lifetime) / interval)
+
+    def get_damage_windows(self, end_time):
+        """(start, end) of every damage phase that begins before end_time"""
+        windows = []
+        cycle = self.get_cycle_duration()
+        if cycle <= 0 or self.expansion_interval <= 0:
+            # Neither loop below would ever advance
+            raise ValueError("ring cycle and expansion interval must be positive")
+        level = 0
+        while level * self.expansion_interval < end_time:
+            # The cycle restarts every time the ring expands
+            interval_start = level * self.expansion_interval
+            interval_end = interval_start + self.expansion_interval
+            cycle_start = interval_start
+            while cycle_start + self.warning_duration < min(interval_end, end_time):
+                windows.append((cycle_start + self.warning_duration,
+                                min(cycle_start + cycle, interval_end)))
+                cycle_start += cycle
+            level += 1
+        return windows
+
+    def get_phase(self, elapsed):
+        """Returns "warning" or "damage" for the ring cycle at `elapsed` seconds"""
+        # Time since the ring reached its current position
+        level = self.get_expansion_level(elapsed)
+        time_at_position = elapsed - level * self.expansion_interval
+
+        cycle_time = time_at_position % self.get_cycle_duration()
+        return "warning" if cycle_time < self.warning_duration else "damage"
+
+# Ring phases as stored in batch arrays
+PHASE_WARNING = 0
+PHASE_DAMAGE = 1
+
+def ring_contains(distance, radius, width):
+    """Whether points at `distance` from a ring's center are on the ring.
+
+    Matches how rings are drawn: a band of `width` inward from `radius`.
+    Works on scalars and NumPy arrays.
+    """
+    return (distance <= radius) & (distance > radius - width)
+
+class StarPlacement:
+    """Where a star was put down and which way it turns"""
+    def __init__(self, x, y, clockwise):
+        self.x = x
+        self.y = y
+        self.clockwise = clockwise
+        self.distance = math.hypot(x - ARENA_CENTER_X, y - ARENA_CENTER_Y)
+        self.start_angle = math.atan2(y - ARENA_CENTER_Y, x - ARENA_CENTER_X)
+
+def save_scenario(path, placements, params):
+    """Writes star placements and parameters to a JSON scenario file"""
+    scenario = {
+        'params': params.to_dict(),
+        'stars': [{'x': p.x, 'y': p.y, 'clockwise': p.clockwise} for p in placements],
+    }
+    with open(path, 'w') as f:
+        json.dump(scenario, f, indent=2)
+
+def load_scenario(path):
+    """Reads a JSON scenario file, returning (placements, params)"""
+    with open(path) as f:
+        scenario = json.load(f)
+    placements = [StarPlacement(star['x'], star['y'], bool(star['clockwise']))
+                  for star in scenario['stars']]
+    return placements, SimulationParams.from_dict(scenario.get('params', {}))
+
+class StarState:
+    """Snapshot of one star and its ring at a point in simulation time"""
+    __slots__ = ('x', 'y', 'angle', 'expansion_level')
+
+    def __init__(self, x, y, angle, expansion_level):
+        self.x = x
+        self.y = y
+        self.angle = angle
+        self.expansion_level = expansion_level
+
+class BatchState:
+    """Fight state for N stars (or rings) sampled at T times, as (T, N) arrays"""
+    def __init__(self, times, x, y, radius, width, phase, star=None):
+        self.times = times
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.width = width
+        self.phase = phase  # PHASE_WARNING or PHASE_DAMAGE
+        # Which star each column belongs to
+        self.star = star if star is not None else np.arange(x.shape[1])
+
+    def is_damage(self):
+        return self.phase == PHASE_DAMAGE
+
+class RingPool:
+    """Every ring alive at one moment, as parallel arrays: a star's own ring
+    and its waves alike, so drawing and hit tests never walk per-star objects"""
+    def __init__(self, x, y, radius, width, phase, star):
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.width = width
+        self.phase = phase
+        self.star = star
+
+    def __len__(self):
+        return len(self.radius)
+
+DEFAULT_KEYFRAME_CAPACITY = 4096
+
+class RewindBuffer:
+    """Fixed-capacity ring buffer of fight keyframes, stored as parallel arrays.
+
+    Each keyframe holds the simulation time, the total rotation reached and the
+    rotation speed from there on, plus every star's angle. All arrays are
+    allocated up front; once full, the oldest keyframe is overwritten, and
+    times before it read as the oldest keyframe. Rotation is linear between
+    keyframes, so interpolating between them is exact and keyframes are only
+    needed where the speed changes.
+    """
+    def __init__(self, distance, direction, capacity=DEFAULT_KEYFRAME_CAPACITY):
+        self.distance = np.asarray(distance, dtype=np.float64)
+        self.direction = np.asarray(direction, dtype=np.float64)
+        self.capacity = capacity
+        star_count = len(self.distance)
+        self.time = np.zeros(capacity)
+        self.rotation = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.angle = np.zeros((capacity, star_count))
+        self.start = 0  # Slot of the oldest keyframe
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+
+    def _slot(self, index):
+        return (self.start + index) % self.capacity
+
+    def _slots(self):
+        return (self.start + np.arange(self.count)) % self.capacity
+
+    def get_time(self, index):
+        return float(self.time[self._slot(index)])
+
+    def get_earliest_time(self):
+        return float(self.time[self.start]) if self.count else 0.0
+
+    def get_latest_time(self):
+        return float(self.time[self._slot(self.count - 1)]) if self.count else 0.0
+
+    def append(self, t, rotation, speed, angle):
+        if self.count == self.capacity:
+            self.start = self._slot(1)
+            self.count -= 1
+        slot = self._slot(self.count)
+        self.time[slot] = t
+        self.rotation[slot] = rotation
+        self.speed[slot] = speed
+        self.angle[slot] = angle
+        self.count += 1
+
+    def find(self, t):
+        """Index of the last keyframe at or before t (0 if t is before all of them)"""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.time[self._slot(mid)] <= t:
+                low = mid + 1
+            else:
+                high = mid
+        return max(0, low - 1)
+
+    def truncate(self, t):
+        """Drops keyframes at or after t, always keeping the first one"""
+        while self.count > 1 and self.time[self._slot(self.count - 1)] >= t:
+            self.count -= 1
+
+    def set_speed(self, index, speed):
+        self.speed[self._slot(index)] = speed
+
+    def get_rotation(self, t, speed_after):
+        """Total rotation at t; past the last keyframe it continues at speed_after"""
+        # Overwritten keyframes are gone, so earlier times hold the oldest one
+        t = max(t, self.get_earliest_time())
+        i = self.find(t)
+        slot = self._slot(i)
+        speed = speed_after if i == self.count - 1 else self.speed[slot]
+        return float(self.rotation[slot] + speed * (t - self.time[slot]))
+
+    def get_rotations(self, times, speed_after):
+        """Vectorized get_rotation for an array of times"""
+        slots = self._slots()
+        key_times = self.time[slots]
+        speeds = self.speed[slots]
+        speeds[-1] = speed_after
+        times = np.maximum(times, key_times[0])
+        i = np.clip(np.searchsorted(key_times, times, side='right') - 1, 0, None)
+        return self.rotation[slots][i] + speeds[i] * (times - key_times[i])
+
+    def interpolate(self, t, speed_after):
+        """Every star's (x, y, angle) at time t"""
+        slot = self._slot(self.find(t))
+        angle = self.angle[slot] + self.direction * (self.get_rotation(t, speed_after) - self.rotation[slot])
+        return (ARENA_CENTER_X + self.distance * np.cos(angle),
+                ARENA_CENTER_Y + self.distance * np.sin(angle),
+                angle)
+
+class SimulationCore:
+    """Deterministic fight state as a function of simulation time"""
+    def __init__(self, placements=(), params=None, keyframe_capacity=DEFAULT_KEYFRAME_CAPACITY):
+        self.placements = list(placements)
+        self.params = params if params is not None else SimulationParams()
+        self.keyframe_capacity = keyframe_capacity
+        self.time = 0.0
+        self.reset_rotation()
+
+    def reset_rotation(self):
+        # Rotation is piecewise linear in time. A keyframe is only added when
+        # the speed changes, so seeking stays O(1) in the length of the fight;
+        # the last segment always turns at params.rotation_speed.
+        self.keyframes = RewindBuffer([p.distance for p in self.placements],
+                                      [1.0 if p.clockwise else -1.0 for p in self.placements],
+                                      self.keyframe_capacity)
+        self.add_keyframe(0.0, 0.0, self.params.rotation_speed)
+
+    def add_keyframe(self, t, rotation, speed):
+        start_angle = np.array([p.start_angle for p in self.placements], dtype=np.float64)
+        self.keyframes.append(t, rotation, speed, start_angle + self.keyframes.direction * rotation)
+
+    def add_star(self, placement):
+        # Stars are placed before the fight starts, so the keyframes restart
+        self.placements.append(placement)
+        self.reset_rotation()
+
+    def reset(self):
+        self.time = 0.0
+        self.reset_rotation()
+
+    def advance(self, dt):
+        self.time += dt
+
+    def seek(self, t):
+        """Jumps straight to simulation time t, past or future"""
+        self.time = max(self.get_earliest_time(), t)
+
+    def get_earliest_time(self):
+        """Earliest time still covered by the keyframe buffer"""
+        return self.keyframes.get_earliest_time()
+
+    def set_param(self, attr, value):
+        if attr == "rotation_speed":
+            # Changing speed rewrites the timeline from now on: freeze the speed
+            # of the running segment, drop keyframes past now and start a new one
+            keyframes = self.keyframes
+            rotation = self.get_rotation(self.time)
+            keyframes.set_speed(len(keyframes) - 1, self.params.rotation_speed)
+            keyframes.truncate(self.time)
+            if self.time > keyframes.get_latest_time():
+                self.add_keyframe(self.time, rotation, value)
+        setattr(self.params, attr, value)
+
+    def get_param_change_start(self, attr, t):
+        """Earliest time whose state changes when set_param(attr, ...) is called at time t"""
+        # Rotation keyframes keep everything before t as it was; every other
+        # parameter applies to the whole fight
+        return t if attr == "rotation_speed" else 0.0
+
+    def get_rotation(self, t):
+        """Total angle (radians) a star has turned through by time t"""
+        return self.keyframes.get_rotation(t, self.params.rotation_speed)
+
+    def get_star_state(self, index, t=None):
+        return self.get_state(t)[index]
+
+    def get_state(self, t=None):
+        if t is None:
+            t = self.time
+        if not self.placements:
+            return []
+        x, y, angle = self.keyframes.interpolate(t, self.params.rotation_speed)
+        level = self.params.get_expansion_level(t)
+        return [StarState(float(x[i]), float(y[i]), float(angle[i]), level)
+                for i in range(len(self.placements))]
+
+    def get_last_level(self):
+        """Expansion level at which the stars' own rings stop reaching the arena"""
+        params = self.params
+        star_radius = params.get_star_radius()
+        if star_radius <= 0 or params.ring_spacing <= 0 or not self.placements:
+            return 0
+        # Farthest any arena point can be from a star, plus the ring's band
+        reach = ARENA_RADIUS + max(p.distance for p in self.placements) + params.get_ring_width()
+        last_level = math.floor((reach / star_radius - params.ring_start_offset) / params.ring_spacing) + 1
+        return max(1, last_level)
+
+    def get_fight_duration(self):
+        """Time after which no ring can reach any part of the arena"""
+        last_level = self.get_last_level()
+        if last_level and self.params.get_wave_slots():
+            # Stars stop emitting with their own ring; the last waves outlive it
+            last_level += int(self.params.wave_lifetime)
+        return last_level * self.params.expansion_interval
+
+    def get_ring_radius(self, t=None):
+        if t is None:
+            t = self.time
+        return self.params.get_ring_radius(self.params.get_expansion_level(t))
+
+    def get_phase(self, t=None):
+        return self.params.get_phase(self.time if t is None else t)
+
+    def simulate(self, duration, step=1.0 / FPS):
+        """Yields (time, states) from now until `duration` seconds have passed"""
+        end = self.time + duration
+        while self.time <= end:
+            yield self.time, self.get_state()
+            self.advance(step)
+
+    def get_rotations(self, times):
+        """Vectorized get_rotation for an array of times"""
+        times = np.asarray(times, dtype=np.float64)
+        return self.keyframes.get_rotations(times, self.params.rotation_speed)
+
+    def evaluate(self, times):
+        """Evaluates every star at every time in one vectorized pass.
+
+        Returns a BatchState whose arrays have shape (len(times), len(placements)).
+        """
+        times = np.asarray(times, dtype=np.float64).reshape(-1)
+        params = self.params
+        x, y = self.get_positions(times)
+
+        level = np.maximum(np.floor(times / params.expansion_interval), 0.0)
+        time_at_position = times - level * params.expansion_interval
+        cycle_time = np.mod(time_at_position, params.get_cycle_duration())
+        phase = np.where(cycle_time < params.warning_duration, PHASE_WARNING, PHASE_DAMAGE).astype(np.int8)
+
+        shape = x.shape
+        radius = params.get_star_radius() * (params.ring_start_offset + level * params.ring_spacing)
+        return BatchState(times, x, y,
+                          np.broadcast_to(radius[:, None], shape).copy(),
+                          np.full(shape, params.get_ring_width()),
+                          np.broadcast_to(phase[:, None], shape).copy())
+
+    def get_positions(self, times):
+        """(T, N) star x and y at every time"""
+        distance = np.array([p.distance for p in self.placements], dtype=np.float64)
+        start_angle = np.array([p.start_angle for p in self.placements], dtype=np.float64)
+        direction = np.array([1.0 if p.clockwise else -1.0 for p in self.placements])
+        angle = start_angle + np.outer(self.get_rotations(times), direction)
+        return ARENA_CENTER_X + distance * np.cos(angle), ARENA_CENTER_Y + distance * np.sin(angle)
+
+    def evaluate_rings(self, times):
+        """Like evaluate(), but with one column per ring instead of per star.
+
+        Every star's own ring comes first, then one column per star for each
+        wave slot; `star` maps columns back to stars. A wave is dropped every
+        emission_interval expansion levels at the star's position at the time,
+        stays there and expands like the star's own ring, for wave_lifetime
+        levels. Columns with no ring alive at a time get radius -1, which
+        ring_contains never matches.
+        """
+        batch = self.evaluate(times)
+        params = self.params
+        slots = params.get_wave_slots()
+        if slots == 0 or not self.placements:
+            return batch
+
+        times = batch.times
+        shape = batch.x.shape
+        interval = int(params.emission_interval)
+        level = np.maximum(np.floor(times / params.expansion_interval), 0.0).astype(np.int64)
+        xs, ys, radii = [batch.x], [batch.y], [batch.radius]
+        for slot in range(slots):
+            emitted = (level // interval - slot) * interval
+            age = level - emitted
+            # Level 0 is the star's own ring; emission stops when that ring leaves the arena
+            alive = (emitted >= interval) & (age < params.wave_lifetime) & (emitted < self.get_last_level())
+            x, y = self.get_positions(np.maximum(emitted, 0) * params.expansion_interval)
+            radius = np.where(alive, params.get_ring_radius(age), -1.0)
+            xs.append(x)
+            ys.append(y)
+            radii.append(np.broadcast_to(radius[:, None], shape))
+        count = slots + 1
+        return BatchState(times, np.concatenate(xs, axis=1), np.concatenate(ys, axis=1),
+                          np.concatenate(radii, axis=1),
+                          np.full((len(times), shape[1] * count), params.get_ring_width()),
+                          np.tile(batch.phase, count),
+                          np.tile(np.arange(shape[1]), count))
+
+    def get_rings(self, t=None):
+        """RingPool of every ring alive at time t"""
+        if t is None:
+            t = self.time
+        if not self.placements:
+            empty = np.zeros(0)
+            return RingPool(empty, empty, empty, empty, np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64))
+        batch = self.evaluate_rings([t])
+        alive = batch.radius[0] > 0
+        return RingPool(batch.x[0][alive], batch.y[0][alive], batch.radius[0][alive],
+                        batch.width[0][alive], batch.phase[0][alive], batch.star[alive])
+
+def evaluate_placements(placements, times, params=None):
+    """Evaluates N star placements at T times; see SimulationCore.evaluate"""
+    return SimulationCore(placements, params).evaluate(times)
@@ -1,11 +1,26 @@
+import time
+STARTUP_TIME = time.perf_counter()  # Taken before the slow imports, for time-to-first-frame
+
 import pygame
 import math
-import time
+import argparse
 from enum import Enum
 import sys
 import os
 import copy
-from collections import deque
+import csv
+import hashlib
+import json
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from sim_core import (WINDOW_WIDTH, WINDOW_HEIGHT, ARENA_CENTER_X, ARENA_CENTER_Y,
+                      ARENA_RADIUS, FPS, SimulationParams, StarPlacement, SimulationCore,
+                      DEFAULT_KEYFRAME_CAPACITY, PHASE_DAMAGE, load_scenario)
+from sim_analysis import DEFAULT_STAR_COUNT, ExposureTracker, HazardIndex, compute_coverage, plan_dodge_path
+from recording import SessionRecorder, SessionReplay
 
 # Get the correct path for resources when bundled with PyInstaller
 def resource_path(relative_path):
@@ -18,21 +33,53 @@ def resource_path(relative_path):
     
     return os.path.join(base_path, relative_path)
 
-# Initialize Pygame
-pygame.init()
+def get_default_cache_dir():
+    """Per-user cache folder for the bundled executable, which unpacks plan.png on every launch"""
+    if not getattr(sys, 'frozen', False):
+        return None
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.expanduser("~/.cache")
+    return os.path.join(base, "WoW_Boss_Simulator")
 
-# Constants
-WINDOW_WIDTH = 1194  # Match plan.png width
-WINDOW_HEIGHT = 671  # Match plan.png height
-ARENA_RADIUS = 300  # Adjusted for new window size
-FPS = 60
-
-# Default adjustable parameters
-DEFAULT_STAR_SIZE = 0.090  # Multiplier of arena radius
-DEFAULT_RING_WIDTH = 1.1  # Multiplier of star radius
-DEFAULT_ROTATION_SPEED = 0.2  # Radians per second
-DEFAULT_RING_START_OFFSET = 3.0  # Multiplier of star radius
-DEFAULT_RING_SPACING = 2.5  # Multiplier of star radius
+def load_background(path, cache_dir=None):
+    """Loads an image converted to the display's pixel format.
+    
+    With cache_dir, the decoded pixels are also kept there as a .npy file
+    named after a hash of the image, which later launches memory-map instead
+    of decoding the PNG again.
+    """
+    cache_path = None
+    if cache_dir:
+        # The cache is only an optimization: any trouble with it falls back to the PNG
+        try:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()[:16]
+            name = os.path.splitext(os.path.basename(path))[0]
+            cache_path = os.path.join(cache_dir, f"{name}-{digest}.npy")
+            if os.path.exists(cache_path):
+                pixels = np.load(cache_path, mmap_mode='r')
+                height, width = pixels.shape[:2]
+                return pygame.image.frombuffer(pixels, (width, height), 'RGB').convert()
+        except (OSError, ValueError) as e:
+            print(f"Ignoring background cache: {e}")
+    
+    image = pygame.image.load(path)
+    if cache_path is not None:
+        temp_path = cache_path + ".tmp.npy"
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            pixels = np.frombuffer(pygame.image.tobytes(image, 'RGB'), dtype=np.uint8)
+            # Write then rename, so a half-written cache is never picked up
+            np.save(temp_path, pixels.reshape(image.get_height(), image.get_width(), 3))
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"Could not cache background: {e}")
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+    # Matching the display format keeps every later blit a plain copy
+    return image.convert()
 
 # Colors
 BLACK = (0, 0, 0)
@@ -40,179 +87,577 @@ WHITE = (255, 255, 255)
 GRAY = (128, 128, 128)
 YELLOW = (255, 255, 0)
 RED = (255, 0, 0)
+GREEN = (0, 200, 0)
 BLUE = (0, 150, 255)
 PURPLE = (128, 0, 128)
 
+MIN_TIMELINE_LENGTH = 60.0  # Seconds shown on the timeline before anything is played
+SIM_TICK = 1.0 / FPS  # Fixed simulation step, independent of the render rate
+MAX_FRAME_TIME = 0.25  # Longest stall the simulation catches up on in one frame
+SPOT_LOOKAHEAD = 3.0  # Seconds ahead the cursor safety readout checks
+PREVIEW_SECONDS = 6.0  # How far ahead the what-if preview looks
+EXPOSURE_CATCH_UP_TIME = 0.004  # Seconds per frame the exposure overlay spends catching up
+EXPOSURE_REDRAW_TICKS = 3  # Ticks of new exposure the overlay waits for before redrawing
+
 class GameState(Enum):
     SETUP = 1
     PLAYING = 2
     PAUSED = 3
 
-class SimulationParams:
-    def __init__(self):
-        self.star_size = DEFAULT_STAR_SIZE
-        self.ring_width = DEFAULT_RING_WIDTH
-        self.rotation_speed = DEFAULT_ROTATION_SPEED
-        self.ring_start_offset = DEFAULT_RING_START_OFFSET
-        self.ring_spacing = DEFAULT_RING_SPACING
+class RingLayer:
+    """Composites every ring in a RingPool onto the screen from cached ring sprites"""
+    def __init__(self, max_sprites=64, max_sprite_radius=WINDOW_WIDTH // 2, max_sprite_pixels=8 * 1024 * 1024,
+                 max_blended_rings=48):
+        self.overlays = {}  # color -> window-sized Surface
+        self.window_rect = pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.max_sprites = max_sprites
+        self.max_sprite_radius = max_sprite_radius
+        self.max_sprite_pixels = max_sprite_pixels  # Total size of all cached sprites, 4 bytes each
+        self.max_blended_rings = max_blended_rings  # More rings than this go on the overlays
+        self.sprite_pixels = 0
+        self.sprites = OrderedDict()  # (radius, width, color, solid) -> Surface, in LRU order
         
-    def get_star_radius(self):
-        return ARENA_RADIUS * self.star_size
+    def get_sprite(self, radius, width, color, solid=False):
+        key = (radius, width, color, solid)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            return sprite
         
-    def get_ring_width(self):
-        return self.get_star_radius() * self.ring_width
-
-class Ring:
-    def __init__(self, star, params):
-        self.star = star
-        self.params = params
-        self.base_radius = params.get_star_radius() * params.ring_start_offset
-        self.expansion_level = 0  # How many times the ring has expanded
-        self.warning_duration = 2.0  # 2 seconds warning phase
-        self.damage_duration = 0.5  # 0.5 seconds damage phase
-        self.cycle_duration = self.warning_duration + self.damage_duration  # Total 2.5 seconds per cycle
-        self.expansion_interval = 3.0  # Move to next position every 3 seconds
-        
-    def update(self, current_time, simulation_start_time):
-        # Calculate time since simulation started
-        elapsed = current_time - simulation_start_time
-        
-        # Check if it's time to expand to next position
-        expected_expansions = int(elapsed / self.expansion_interval)
-        if expected_expansions > self.expansion_level:
-            self.expansion_level = expected_expansions
-            
-    def get_radius(self):
-        # Each expansion adds more distance
-        return self.base_radius + (self.expansion_level * self.params.get_star_radius() * self.params.ring_spacing)
-    
-    def get_phase_and_alpha(self, current_time, simulation_start_time):
-        # Calculate time since this ring reached current position
-        time_at_position = (current_time - simulation_start_time) - (self.expansion_level * self.expansion_interval)
+        size = 2 * radius + 2
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        # Solid sprites are fully opaque, for copying onto an overlay
+        pygame.draw.circle(sprite, (*color[:3], 255) if solid else color, (radius + 1, radius + 1), radius, width)
+        # Run-length encoding skips the transparent middle: 5x faster blits,
+        # and opaque runs are plain copies
+        sprite.set_alpha(255, pygame.RLEACCEL)
+        self.sprites[key] = sprite
+        self.sprite_pixels += size * size
+        while len(self.sprites) > 1 and (len(self.sprites) > self.max_sprites
+                                         or self.sprite_pixels > self.max_sprite_pixels):
+            old = self.sprites.popitem(last=False)[1]
+            self.sprite_pixels -= old.get_width() * old.get_height()
+        return sprite
         
-        # Determine which phase of the cycle we're in
-        cycle_time = time_at_position % self.cycle_duration
+    def get_overlay(self, color):
+        overlay = self.overlays.get(color)
+        if overlay is None:
+            overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+            self.overlays[color] = overlay
+        return overlay
         
-        if cycle_time < self.warning_duration:
-            # Warning phase - purple ring on ground
-            return "warning", 120
-        else:
-            # Damage phase - bright red/orange flash
-            return "damage", 200
-            
-    def draw(self, screen, current_time, simulation_start_time, is_playing):
-        # Draw the ring at its current expansion level
-        ring_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+    def get_color(self, phase, is_playing):
+        # Damage flashes only show while playing; otherwise rings stay purple
+        if is_playing and phase == PHASE_DAMAGE:
+            return (255, 0, 0, 200)
+        return (*PURPLE, 120)
         
-        radius = self.get_radius()
+    def draw(self, screen, pool, is_playing):
+        """Draws the rings in a RingPool, returning the screen areas they cover"""
+        cx = pool.x.astype(np.int64)
+        cy = pool.y.astype(np.int64)
+        radii = pool.radius.astype(np.int64)
+        widths = pool.width.astype(np.int64)
+        # Cull in bulk: rings off the window, and rings whose inner edge
+        # already encloses the whole window
+        inner = radii - widths
+        far_x = np.maximum(cx, WINDOW_WIDTH - cx)
+        far_y = np.maximum(cy, WINDOW_HEIGHT - cy)
+        shown = ((radii > 0) & (cx + radii >= 0) & (cx - radii < WINDOW_WIDTH)
+                 & (cy + radii >= 0) & (cy - radii < WINDOW_HEIGHT)
+                 & ~((widths > 0) & (inner > 0) & (inner * inner > far_x * far_x + far_y * far_y)))
+        indices = np.flatnonzero(shown).tolist()
+        use_overlays = len(indices) > self.max_blended_rings
         
-        # Only show damage phase if simulation is playing
-        if is_playing:
-            phase, alpha = self.get_phase_and_alpha(current_time, simulation_start_time)
+        batch = []
+        layers = {}  # color -> [covered area, solid sprite blits, oversized rings]
+        rects = []
+        for i in indices:
+            x, y, radius, width = int(cx[i]), int(cy[i]), int(radii[i]), int(widths[i])
+            bounds = pygame.Rect(x - radius - 1, y - radius - 1, 2 * radius + 2, 2 * radius + 2)
+            visible = bounds.clip(self.window_rect)
+            if visible.width == 0 or visible.height == 0:
+                continue
             
-            if phase == "warning":
-                # Purple warning ring
-                color_with_alpha = (*PURPLE, alpha)
+            color = self.get_color(pool.phase[i], is_playing)
+            rects.append(visible)
+            if radius <= self.max_sprite_radius and not use_overlays:
+                batch.append((self.get_sprite(radius, width, color), bounds.topleft))
+                continue
+            layer = layers.get(color)
+            if layer is None:
+                layer = layers[color] = [visible, [], []]
             else:
-                # Red damage flash
-                color_with_alpha = (255, 0, 0, alpha)  # Pure red for damage
-        else:
-            # When not playing, always show purple rings
-            color_with_alpha = (*PURPLE, 120)
-            
-        pygame.draw.circle(ring_surface, color_with_alpha, 
-                         (int(self.star.x), int(self.star.y)), 
-                         int(radius), int(self.params.get_ring_width()))
+                layer[0] = layer[0].union(visible)
+            if radius <= self.max_sprite_radius:
+                layer[1].append((self.get_sprite(radius, width, color, solid=True), bounds.topleft))
+            else:
+                layer[2].append(((x, y), radius, width))
         
-        screen.blit(ring_surface, (0, 0))
+        if batch:
+            screen.blits(batch, doreturn=False)
+        for color, (area, blits, oversized) in layers.items():
+            # Clear and blend only the part of the window the layer covers
+            overlay = self.get_overlay(color)
+            overlay.fill((0, 0, 0, 0), area)
+            overlay.blits(blits, doreturn=False)
+            for center, radius, width in oversized:
+                pygame.draw.circle(overlay, (*color[:3], 255), center, radius, width)
+            alpha = pygame.surfarray.pixels_alpha(overlay)
+            np.minimum(alpha[area.left:area.right, area.top:area.bottom], color[3],
+                       out=alpha[area.left:area.right, area.top:area.bottom])
+            del alpha  # Unlocks the overlay
+            screen.blit(overlay, area.topleft, area)
+        return rects
 
-class Star:
-    def __init__(self, x, y, clockwise, params):
-        self.start_x = x
-        self.start_y = y
-        self.x = x
-        self.y = y
-        self.clockwise = clockwise
-        self.params = params
-        self.angle = math.atan2(y - WINDOW_HEIGHT//2, x - WINDOW_WIDTH//2)
-        self.ring = Ring(self, params)  # Each star has one ring
-    
-    def get_state(self):
-        """Returns a snapshot of the star's current state"""
-        return {
-            'x': self.x,
-            'y': self.y,
-            'angle': self.angle,
-            'ring_expansion_level': self.ring.expansion_level
-        }
-    
-    def set_state(self, state):
-        """Restores the star to a previous state"""
-        self.x = state['x']
-        self.y = state['y']
-        self.angle = state['angle']
-        self.ring.expansion_level = state['ring_expansion_level']
-        
-    def update(self, current_time, is_playing, simulation_start_time):
-        if not is_playing:
-            return
-            
-        # No delay - start immediately
-            
-        # Rotate the star
-        if self.clockwise:
-            self.angle += self.params.rotation_speed / FPS
-        else:
-            self.angle -= self.params.rotation_speed / FPS
-            
-        # Update position based on angle
-        center_x = WINDOW_WIDTH // 2
-        center_y = WINDOW_HEIGHT // 2
-        distance = math.sqrt((self.start_x - center_x)**2 + (self.start_y - center_y)**2)
+class RenderCache:
+    """Bounded LRU caches of pre-rendered star sprites and text surfaces"""
+    def __init__(self, max_sprites=16, max_texts=256):
+        self.max_sprites = max_sprites
+        self.max_texts = max_texts
+        self.star_sprites = OrderedDict()  # (radius, clockwise) -> Surface
+        self.texts = OrderedDict()  # (font, string, color) -> Surface
         
-        self.x = center_x + distance * math.cos(self.angle)
-        self.y = center_y + distance * math.sin(self.angle)
+    def get_cached(self, cache, key, limit, create):
+        surface = cache.get(key)
+        if surface is not None:
+            cache.move_to_end(key)
+            return surface
+        surface = create()
+        cache[key] = surface
+        if len(cache) > limit:
+            cache.popitem(last=False)
+        return surface
+        
+    def get_star_sprite(self, star_radius, clockwise):
+        return self.get_cached(self.star_sprites, (star_radius, clockwise), self.max_sprites,
+                               lambda: self.draw_star_sprite(star_radius, clockwise))
+        
+    def render_text(self, font, string, color):
+        return self.get_cached(self.texts, (font, string, color), self.max_texts,
+                               lambda: font.render(string, True, color))
+        
+    def invalidate(self):
+        """Drops star sprites, e.g. after parameters that size them changed"""
+        self.star_sprites.clear()
+        
+    def draw_star_sprite(self, star_radius, clockwise):
+        circle_radius = int(star_radius * 1.3)  # Slightly larger than the star
+        half = circle_radius + 1
+        sprite = pygame.Surface((2 * half + 1, 2 * half + 1), pygame.SRCALPHA)
         
-        # Update the ring
-        self.ring.update(current_time, simulation_start_time)
-    
-    def draw(self, screen):
         # Draw the background circle first
-        circle_color = BLUE if self.clockwise else PURPLE
-        star_radius = self.params.get_star_radius()
-        circle_radius = star_radius * 1.3  # Slightly larger than the star
-        pygame.draw.circle(screen, circle_color, (int(self.x), int(self.y)), int(circle_radius))
+        circle_color = BLUE if clockwise else PURPLE
+        pygame.draw.circle(sprite, circle_color, (half, half), circle_radius)
         
         # Draw the star on top
         points = []
         for i in range(5):
             angle = -math.pi/2 + (i * 2 * math.pi / 5)
-            outer_x = self.x + star_radius * math.cos(angle)
-            outer_y = self.y + star_radius * math.sin(angle)
-            points.append((outer_x, outer_y))
+            points.append((half + star_radius * math.cos(angle), half + star_radius * math.sin(angle)))
             
             angle = -math.pi/2 + ((i + 0.5) * 2 * math.pi / 5)
-            inner_x = self.x + (star_radius * 0.4) * math.cos(angle)
-            inner_y = self.y + (star_radius * 0.4) * math.sin(angle)
-            points.append((inner_x, inner_y))
+            points.append((half + (star_radius * 0.4) * math.cos(angle),
+                           half + (star_radius * 0.4) * math.sin(angle)))
+        
+        pygame.draw.polygon(sprite, YELLOW, points)
+        return sprite
+
+class HeatmapOverlay:
+    """Shows a CoverageMap as a translucent heatmap over the arena.
+    
+    Cells never hit during a damage phase are tinted green; the rest go from
+    yellow to red with their share of the fight spent under a ring. Coverage
+    is computed on a worker thread, and a new request replaces any that has
+    not started, so holding a parameter key only computes the latest value.
+    """
+    def __init__(self):
+        self.coverage = None
+        self.surface = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+        
+    def request(self, placements, params):
+        """Starts recomputing the heatmap for the stars and parameters as they are now"""
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+        if not placements:
+            self.coverage = None
+            self.surface = None
+            return
+        # The worker gets its own copies; the live ones keep changing
+        self.future = self.executor.submit(self.compute, list(placements), copy.copy(params))
         
-        pygame.draw.polygon(screen, YELLOW, points)
+    def compute(self, placements, params):
+        coverage = compute_coverage(placements, params)
+        fraction = coverage.fraction
+        peak = fraction.max()
+        level = fraction / peak if peak > 0 else fraction
+        rows, cols = fraction.shape
+        rgba = np.zeros((rows, cols, 4), dtype=np.uint8)
+        rgba[..., 0] = np.where(level > 0, 255, 0)
+        rgba[..., 1] = np.where(level > 0, 255 * (1 - level), 255).astype(np.uint8)
+        alpha = np.where(level > 0, 60 + 140 * level, 50)
+        rgba[..., 3] = np.where(coverage.inside, alpha, 0).astype(np.uint8)
+        return coverage, rgba
         
-    def draw_ring(self, screen, current_time, simulation_start_time, is_playing):
-        self.ring.draw(screen, current_time, simulation_start_time, is_playing)
+    def poll(self):
+        """Picks up a finished heatmap; returns whether the surface changed"""
+        if self.future is None or not self.future.done():
+            return False
+        self.coverage, rgba = self.future.result()
+        self.future = None
+        rows, cols = rgba.shape[:2]
+        grid = pygame.image.frombuffer(rgba.tobytes(), (cols, rows), 'RGBA')
+        size = (int(cols * self.coverage.cell_size), int(rows * self.coverage.cell_size))
+        self.surface = pygame.transform.smoothscale(grid, size)
+        return True
+        
+    def wait(self):
+        """Blocks until the latest request is done"""
+        if self.future is not None:
+            self.future.exception()
+        return self.poll()
+        
+    def draw(self, screen):
+        if self.surface is not None:
+            origin = self.coverage.origin
+            screen.blit(self.surface, (int(origin[0]), int(origin[1])))
+        
+    def shutdown(self):
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+        self.executor.shutdown(wait=False)
 
-class Arena:
+class ExposureOverlay:
+    """Shows an ExposureTracker's low-resolution grid over the arena.
+    
+    Cells go from yellow to red with their exposure so far; cells never hit
+    stay clear. The grid is only recolored and upscaled when the exposure
+    changes, which is during damage phases, and at most every few ticks while
+    it plays. Catching up after a parameter change or a jump is spread over
+    frames, showing the last grid until it is done, instead of stalling one.
+    """
     def __init__(self):
+        self.enabled = False
+        self.tracker = None
+        self.version = None
+        self.ticks = 0  # Tracker ticks the surface shows
+        self.surface = None
+        
+    def draw(self, screen, tracker, simulation_time, is_playing):
+        deadline = time.perf_counter() + EXPOSURE_CATCH_UP_TIME
+        caught_up = tracker.seek(simulation_time, max_ticks=1)
+        while not caught_up and time.perf_counter() < deadline:
+            caught_up = tracker.seek(simulation_time, max_ticks=1)
+        # Keep showing the last grid while catching up, and while playing let a
+        # few ticks of new exposure wait for the next redraw
+        waits = not caught_up or is_playing and 0 < tracker.ticks - self.ticks < EXPOSURE_REDRAW_TICKS
+        if tracker is not self.tracker or self.surface is None or tracker.version != self.version and not waits:
+            self.tracker = tracker
+            self.version = tracker.version
+            self.ticks = tracker.ticks
+            seconds = tracker.seconds
+            peak = seconds.max()
+            level = seconds / peak if peak > 0 else seconds
+            rows, cols = seconds.shape
+            rgba = np.zeros((rows, cols, 4), dtype=np.uint8)
+            rgba[..., 0] = 255
+            rgba[..., 1] = (255 * (1 - level)).astype(np.uint8)
+            rgba[..., 3] = np.where(seconds > 0, 60 + 140 * level, 0).astype(np.uint8)
+            # In the display's format, upscaling and blitting are plain copies
+            grid = pygame.image.frombuffer(rgba.tobytes(), (cols, rows), 'RGBA').convert_alpha()
+            size = (int(cols * tracker.cell_size), int(rows * tracker.cell_size))
+            if self.surface is None or self.surface.get_size() != size:
+                self.surface = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+            pygame.transform.scale(grid, size, self.surface)
+        return screen.blit(self.surface, (int(tracker.origin[0]), int(tracker.origin[1])))
+
+class DodgePathOverlay:
+    """Draws a DodgePlan: the whole path, and where to stand at the shown time"""
+    def __init__(self):
+        self.plan = None
+        self.points = []
+        
+    def set_plan(self, plan):
+        self.plan = plan
+        self.points = []
+        if plan is not None:
+            # Standing still adds nothing to the line
+            for x, y in plan.positions:
+                point = (int(x), int(y))
+                if not self.points or point != self.points[-1]:
+                    self.points.append(point)
+        
+    def draw(self, screen, simulation_time):
+        if self.plan is None:
+            return None
+        color = GREEN if self.plan.is_safe() else YELLOW
+        x, y = self.plan.get_position(simulation_time)
+        rect = pygame.draw.circle(screen, color, (int(x), int(y)), 6, 2)
+        if len(self.points) > 1:
+            rect = rect.union(pygame.draw.lines(screen, color, False, self.points, 2))
+        return rect
+
+class PreviewResult:
+    """Star trails and damage-phase rings over the next PREVIEW_SECONDS"""
+    def __init__(self, generation, start, end, trails, rings):
+        self.generation = generation
+        self.start = start
+        self.end = end
+        self.trails = trails  # One list of points per star
+        self.rings = rings  # (x, y, radius, width) for each damage phase and star
+
+class WhatIfPreview:
+    """Ghosted look at the next few seconds, computed on a worker thread.
+    
+    Every request bumps a generation number; a job that sees it is no longer
+    the latest stops between chunks, and its result is thrown away, so
+    scrubbing a parameter never queues up work behind the newest value.
+    """
+    def __init__(self, horizon=PREVIEW_SECONDS, trail_step=0.1, chunk_size=16):
+        self.horizon = horizon
+        self.trail_step = trail_step
+        self.chunk_size = chunk_size
+        self.enabled = False
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.generation = 0
+        self.future = None
+        self.result = None
+        
+    def request(self, core, start):
+        """Starts computing a preview from `start` with the core as it is now"""
+        self.clear()
+        # The worker gets its own copy; the live core keeps changing
+        self.future = self.executor.submit(self.compute, copy.deepcopy(core), start, self.generation)
+        
+    def clear(self):
+        self.generation += 1
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+        self.result = None
+        
+    def compute(self, core, start, generation):
+        end = start + self.horizon
+        times = np.arange(start, end + self.trail_step / 2, self.trail_step)
+        xs, ys = [], []
+        for first in range(0, len(times), self.chunk_size):
+            if generation != self.generation:
+                return None
+            x, y = core.get_positions(times[first:first + self.chunk_size])
+            xs.append(x)
+            ys.append(y)
+        x, y = np.concatenate(xs), np.concatenate(ys)
+        trails = [[(int(px), int(py)) for px, py in zip(x[:, i], y[:, i])] for i in range(x.shape[1])]
+        
+        # Every ring alive half-way through each damage phase
+        windows = [(max(s, start), e) for s, e in core.params.get_damage_windows(end) if e > start]
+        rings = []
+        if windows and generation == self.generation:
+            batch = core.evaluate_rings([(s + e) / 2 for s, e in windows])
+            rings = [(int(batch.x[k, i]), int(batch.y[k, i]), batch.radius[k, i], batch.width[k, i])
+                     for k, i in zip(*np.nonzero(batch.radius > 0))]
+        return PreviewResult(generation, start, end, trails, rings)
+        
+    def poll(self):
+        """Picks up a finished preview, if it is still the latest one"""
+        if self.future is not None and self.future.done():
+            result = self.future.result()
+            self.future = None
+            if result is not None and result.generation == self.generation:
+                self.result = result
+        
+    def draw(self, screen, simulation_time):
+        result = self.result
+        if result is None or not result.start <= simulation_time <= result.end:
+            return None
+        rects = []
+        for trail in result.trails:
+            if len(trail) > 1:
+                rects.append(pygame.draw.lines(screen, (90, 90, 110), False, trail, 1))
+        for x, y, radius, width in result.rings:
+            # Outline both edges of the band rather than filling it
+            rects.append(pygame.draw.circle(screen, (140, 70, 170), (x, y), int(radius), 1))
+            if radius - width >= 1:
+                pygame.draw.circle(screen, (140, 70, 170), (x, y), int(radius - width), 1)
+        return rects[0].unionall(rects[1:]) if rects else None
+        
+    def shutdown(self):
+        self.clear()
+        self.executor.shutdown(wait=False)
+
+class PhaseTimer:
+    def __init__(self, profiler, phase):
+        self.profiler = profiler
+        self.phase = phase
+        
+    def __enter__(self):
+        self.start = time.perf_counter()
+        
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.phase, time.perf_counter() - self.start)
+
+class FrameProfiler:
+    """Per-phase wall-clock timings (seconds) of the current frame"""
+    PHASES = ("events", "update", "draw", "arena", "rings", "stars", "ui", "parameters", "flip")
+    
+    def __init__(self):
+        self.timings = {}
+        
+    def begin_frame(self):
+        self.timings = {}
+        
+    def measure(self, phase):
+        return PhaseTimer(self, phase)
+        
+    def record(self, phase, seconds):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+class PerformanceHud:
+    """Toggleable overlay with rolling FPS, clock.tick delta and phase timings.
+    
+    The overlay surface is only re-rendered a few times per second, so showing
+    it costs a single blit on most frames.
+    """
+    def __init__(self, font, window=60, refresh_interval=0.25):
+        self.font = font
+        self.visible = False
+        self.tick_deltas = deque(maxlen=window)  # Milliseconds between frames
+        self.phase_history = {phase: deque(maxlen=window) for phase in FrameProfiler.PHASES}
+        self.refresh_interval = refresh_interval
+        self.last_refresh = 0.0
+        self.surface = None
+        
+    def add_frame(self, tick_ms, timings):
+        self.tick_deltas.append(tick_ms)
+        for phase, history in self.phase_history.items():
+            history.append(timings.get(phase, 0.0) * 1000.0)
+            
+    def get_fps(self):
+        if not self.tick_deltas or sum(self.tick_deltas) == 0:
+            return 0.0
+        return 1000.0 * len(self.tick_deltas) / sum(self.tick_deltas)
+        
+    def render(self):
+        lines = [(f"FPS {self.get_fps():.1f}", WHITE),
+                 (f"tick {self.tick_deltas[-1] if self.tick_deltas else 0:.0f} ms", WHITE)]
+        for phase, history in self.phase_history.items():
+            average = sum(history) / len(history) if history else 0.0
+            lines.append((f"{phase:<10} {average:6.2f} ms", YELLOW if phase == "draw" else WHITE))
+        
+        line_height = self.font.get_linesize()
+        surface = pygame.Surface((170, 10 + line_height * len(lines)), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        for i, (line, color) in enumerate(lines):
+            surface.blit(self.font.render(line, True, color), (8, 5 + i * line_height))
+        return surface
+        
+    def draw(self, screen, position):
+        now = time.perf_counter()
+        if self.surface is None or now - self.last_refresh >= self.refresh_interval:
+            self.surface = self.render()
+            self.last_refresh = now
+        return screen.blit(self.surface, position)
+
+class TraceWriter:
+    """Streams per-frame timings to a CSV or JSON-lines (.jsonl) file"""
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.is_jsonl = path.endswith(('.jsonl', '.json'))
+        self.fields = ["frame", "time", "tick_ms"] + [f"{phase}_ms" for phase in FrameProfiler.PHASES]
+        self.csv = None
+        if not self.is_jsonl:
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(self.fields)
+        self.frame = 0
+        self.start = time.perf_counter()
+        
+    def write(self, tick_ms, timings):
+        row = [self.frame, round(time.perf_counter() - self.start, 6), tick_ms]
+        row.extend(round(timings.get(phase, 0.0) * 1000.0, 4) for phase in FrameProfiler.PHASES)
+        if self.is_jsonl:
+            self.file.write(json.dumps(dict(zip(self.fields, row))) + "\n")
+        else:
+            self.csv.writerow(row)
+        self.frame += 1
+        
+    def close(self):
+        self.file.close()
+
+class DirtyRectRenderer:
+    """Updates only the parts of the window that changed since the last frame.
+    
+    The static layers are rendered once into a cached background. Each frame
+    the areas drawn over in the previous frame are restored from it, and only
+    those areas plus the newly drawn ones are pushed to the display.
+    """
+    def __init__(self, full_update_fraction=0.6):
+        self.background = None
+        self.previous_rects = []
+        self.full_update = True
+        # Past this much dirty area a single full update is cheaper
+        self.full_update_area = WINDOW_WIDTH * WINDOW_HEIGHT * full_update_fraction
+        
+    def invalidate(self):
+        """Rebuilds the cached background on the next frame"""
+        self.background = None
+        
+    def begin(self, screen, draw_background):
+        if self.background is None:
+            self.background = pygame.Surface(screen.get_size()).convert()
+            draw_background(self.background)
+            screen.blit(self.background, (0, 0))
+            self.full_update = True
+        else:
+            screen.blits([(self.background, rect, rect) for rect in self.previous_rects], doreturn=False)
+            
+    def present(self, rects):
+        dirty = self.previous_rects + rects
+        if self.full_update or sum(rect.width * rect.height for rect in dirty) > self.full_update_area:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        self.previous_rects = rects
+        self.full_update = False
+
+class Star:
+    """Drawable view of one star; its motion comes from the SimulationCore"""
+    def __init__(self, placement, params):
+        self.placement = placement
+        self.start_x = placement.x
+        self.start_y = placement.y
+        self.x = placement.x
+        self.y = placement.y
+        self.clockwise = placement.clockwise
+        self.params = params
+        self.angle = placement.start_angle
+    
+    def update(self, star_state):
+        """Copies a StarState computed by the core"""
+        self.x = star_state.x
+        self.y = star_state.y
+        self.angle = star_state.angle
+    
+    def draw(self, screen, render_cache):
+        sprite = render_cache.get_star_sprite(self.params.get_star_radius(), self.clockwise)
+        half = sprite.get_width() // 2
+        return screen.blit(sprite, (int(self.x) - half, int(self.y) - half))
+
+class Arena:
+    def __init__(self, cache_dir=None):
         # Center the arena on the actual arena in the background image
         # Adjusted based on where the arena appears in plan.png
-        self.center_x = 597  # Center of the window (1194/2)
-        self.center_y = 335  # Center of the image (671/2)
+        self.center_x = ARENA_CENTER_X  # Center of the window (1194/2)
+        self.center_y = ARENA_CENTER_Y  # Center of the image (671/2)
         self.radius = ARENA_RADIUS
         
         # Load the background image
         try:
             image_path = resource_path("plan.png")
-            self.background = pygame.image.load(image_path)
+            self.background = load_background(image_path, cache_dir)
             # Use image at original resolution
             print(f"Successfully loaded background from: {image_path}")
         except Exception as e:
@@ -234,19 +679,37 @@ class Arena:
             screen.blit(floor_surface, (0, 0))
 
 class WoWBossSimulation:
-    def __init__(self):
+    def __init__(self, keyframe_capacity=DEFAULT_KEYFRAME_CAPACITY, dirty_rects=False, trace_path=None,
+                 render_fps=FPS, record_path=None, replay_path=None, replay_speed=1.0, cache_dir=None,
+                 star_count=DEFAULT_STAR_COUNT):
+        self.created_at = time.perf_counter()
+        self.time_to_first_frame = None  # Seconds from construction to the first frame shown
+        # Only what the game uses; audio and joystick setup are slow to start
+        pygame.display.init()
+        pygame.font.init()
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption("WoW Boss Fight Simulation")
         self.clock = pygame.time.Clock()
+        self.render_fps = render_fps  # 0 renders as fast as the display allows
         self.running = True
         
-        self.arena = Arena()
+        self.arena = Arena(cache_dir)
+        self.ring_layer = RingLayer()
+        self.heatmap = HeatmapOverlay()
+        self.show_heatmap = False
+        self.hazards = None  # HazardIndex, built the first time it is queried
+        self.exposure = None  # ExposureTracker, built the first time it is shown
+        self.exposure_overlay = ExposureOverlay()
+        self.dodge_path = DodgePathOverlay()
+        self.preview = WhatIfPreview()
         self.stars = []
+        self.star_count = star_count  # Stars to place before the fight can start
         self.state = GameState.SETUP
-        self.simulation_start_time = 0
         
         # Simulation parameters
         self.params = SimulationParams()
+        self.keyframe_capacity = keyframe_capacity
+        self.core = SimulationCore(params=self.params, keyframe_capacity=keyframe_capacity)
         
         # UI state
         self.selected_param = 0
@@ -255,36 +718,66 @@ class WoWBossSimulation:
             ("Ring Width", "ring_width", 0.2, 5.0, 0.1),
             ("Rotation Speed", "rotation_speed", 0.01, 5.0, 0.1),
             ("Ring Start Offset", "ring_start_offset", 0.5, 8.0, 0.2),
-            ("Ring Spacing", "ring_spacing", 0.5, 10.0, 0.2)
+            ("Ring Spacing", "ring_spacing", 0.5, 10.0, 0.2),
+            ("Wave Every (levels)", "emission_interval", 0, 10, 1),
+            ("Wave Lifetime (levels)", "wave_lifetime", 1, 20, 1)
         ]
         
         # Fonts
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 24)
         self.tiny_font = pygame.font.Font(None, 20)
+        self.render_cache = RenderCache()
+        self.profiler = FrameProfiler()
+        self.perf_hud = PerformanceHud(self.tiny_font)
+        self.trace = TraceWriter(trace_path) if trace_path else None
+        self.dirty_renderer = DirtyRectRenderer() if dirty_rects else None
         
-        # Rewind system
-        self.history = deque(maxlen=600)  # Store up to 10 seconds of history at 60 FPS
+        # Rewind system - the core computes any time directly, so rewinding is
+        # just a time cursor over everything played so far
         self.is_rewinding = False
-        self.rewind_index = 0
-        self.current_simulation_time = 0
+        self.rewind_time = 0.0
+        self.timeline_end = 0.0  # Furthest simulation time reached
+        self.tick_accumulator = 0.0  # Elapsed time not yet simulated
+        self.max_frame_time = MAX_FRAME_TIME  # Frame exports lift the clamp
         self.rewind_frame_skip = 15  # Default number of frames to skip when rewinding
+        self.timeline_rect = pygame.Rect(460, 18, 460, 14)
+        self.is_scrubbing = False
+        
+        # Session recording, or playing one back instead of taking input
+        self.recorder = SessionRecorder(record_path, self.params, SIM_TICK) if record_path else None
+        self.replay = None
+        self.replay_speed = replay_speed
+        self.replay_paused = False
+        if replay_path:
+            self.replay = SessionReplay.load(replay_path)
+            self.seek_replay(0.0)
         
     def handle_events(self):
         for event in pygame.event.get():
+            if self.replay is not None and self.handle_replay_input(event):
+                continue
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.VIDEOEXPOSE):
+                # The window was uncovered, so more than the dirty rects needs pushing
+                if self.dirty_renderer is not None:
+                    self.dirty_renderer.full_update = True
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
                 elif event.key == pygame.K_SPACE:
-                    if self.state == GameState.SETUP and len(self.stars) == 6:
+                    if self.state == GameState.SETUP and len(self.stars) == self.star_count:
                         self.state = GameState.PLAYING
-                        self.simulation_start_time = time.time()
+                        self.record("resume")
                     elif self.state == GameState.PLAYING:
                         self.state = GameState.PAUSED
+                        self.record("pause")
                     elif self.state == GameState.PAUSED:
+                        if self.is_rewinding:
+                            self.stop_rewind()
                         self.state = GameState.PLAYING
+                        self.record("resume")
                 elif event.key == pygame.K_r:
                     mods = pygame.key.get_mods()
                     if mods & pygame.KMOD_SHIFT and mods & pygame.KMOD_CTRL:
@@ -295,18 +788,12 @@ class WoWBossSimulation:
                         self.soft_reset()
                     else:
                         # R alone for rewind toggle
-                        if self.state in [GameState.PLAYING, GameState.PAUSED] and len(self.history) > 0:
+                        if self.state in [GameState.PLAYING, GameState.PAUSED]:
                             if not self.is_rewinding:
-                                # Start rewinding
-                                self.is_rewinding = True
-                                self.state = GameState.PAUSED
-                                self.rewind_index = len(self.history) - 1
+                                self.start_rewind()
                             else:
                                 # Stop rewinding and resume from current point
-                                self.is_rewinding = False
-                                # Adjust simulation start time to match rewound position
-                                rewound_time = self.history[self.rewind_index]['time']
-                                self.simulation_start_time = time.time() - rewound_time
+                                self.stop_rewind()
                 elif event.key == pygame.K_UP:
                     if self.is_rewinding:
                         # During rewind, UP increases frame skip
@@ -322,142 +809,402 @@ class WoWBossSimulation:
                 elif event.key == pygame.K_LEFT:
                     if self.is_rewinding:
                         # During rewind, LEFT goes back in time
-                        self.rewind_index = max(0, self.rewind_index - self.rewind_frame_skip)
-                        self.restore_from_history(self.rewind_index)
+                        self.seek(self.rewind_time - self.rewind_frame_skip / FPS)
                     else:
                         self.adjust_param(-1)
                 elif event.key == pygame.K_RIGHT:
                     if self.is_rewinding:
                         # During rewind, RIGHT goes forward in time
-                        self.rewind_index = min(len(self.history) - 1, self.rewind_index + self.rewind_frame_skip)
-                        self.restore_from_history(self.rewind_index)
+                        self.seek(self.rewind_time + self.rewind_frame_skip / FPS)
                     else:
                         self.adjust_param(1)
+                elif event.key == pygame.K_HOME and self.is_rewinding:
+                    self.seek(0.0)
+                elif event.key == pygame.K_END and self.is_rewinding:
+                    self.seek(self.timeline_end)
+                elif event.key == pygame.K_h:
+                    self.show_heatmap = not self.show_heatmap
+                    self.refresh_heatmap()
+                elif event.key == pygame.K_e:
+                    self.export_heatmap()
+                elif event.key == pygame.K_p:
+                    self.plan_dodge_path(pygame.mouse.get_pos())
+                elif event.key == pygame.K_w:
+                    self.preview.enabled = not self.preview.enabled
+                    self.refresh_preview()
+                elif event.key == pygame.K_x:
+                    self.exposure_overlay.enabled = not self.exposure_overlay.enabled
+                    if self.dirty_renderer is not None:
+                        self.dirty_renderer.invalidate()
+                elif event.key == pygame.K_F3:
+                    self.perf_hud.visible = not self.perf_hud.visible
+            elif event.type == pygame.MOUSEBUTTONUP:
+                if event.button == 1:
+                    self.is_scrubbing = False
+            elif event.type == pygame.MOUSEMOTION:
+                if self.is_scrubbing:
+                    self.seek(self.get_timeline_time(event.pos[0]))
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1 and self.state == GameState.SETUP:
-                    if len(self.stars) < 6:
+                if (event.button == 1 and self.state in [GameState.PLAYING, GameState.PAUSED]
+                        and self.timeline_rect.collidepoint(event.pos)):
+                    # Clicking the timeline jumps straight to that time
+                    if not self.is_rewinding:
+                        self.start_rewind()
+                    self.is_scrubbing = True
+                    self.seek(self.get_timeline_time(event.pos[0]))
+                elif event.button == 1 and self.state == GameState.SETUP:
+                    if len(self.stars) < self.star_count:
                         x, y = event.pos
                         # Check if click is within arena
                         dist = math.sqrt((x - self.arena.center_x)**2 + 
                                        (y - self.arena.center_y)**2)
                         if dist < self.arena.radius - self.params.get_star_radius():
-                            # First 3 are clockwise (blue), next 3 are counter-clockwise (purple)
-                            clockwise = len(self.stars) < 3
-                            self.stars.append(Star(x, y, clockwise, self.params))
+                            # First half are clockwise (blue), the rest counter-clockwise (purple)
+                            clockwise = len(self.stars) < self.star_count // 2
+                            placement = StarPlacement(x, y, clockwise)
+                            self.core.add_star(placement)
+                            self.record("star", x=x, y=y, clockwise=clockwise)
+                            self.stars.append(Star(placement, self.params))
+                            self.hazards = None
+                            self.exposure = None
+                            self.dodge_path.set_plan(None)
+                            self.refresh_heatmap()
+                            self.refresh_preview()
+    
+    def handle_replay_input(self, event):
+        """Playback controls while replaying; returns whether the event was used up"""
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            return True  # The replay owns the stars
+        if event.type != pygame.KEYDOWN or event.key in (pygame.K_ESCAPE, pygame.K_F3, pygame.K_h, pygame.K_x):
+            return False
+        if event.key == pygame.K_SPACE:
+            self.replay_paused = not self.replay_paused
+        elif event.key == pygame.K_LEFT:
+            self.seek_replay(self.replay.clock - 5.0)
+        elif event.key == pygame.K_RIGHT:
+            self.seek_replay(self.replay.clock + 5.0)
+        elif event.key == pygame.K_HOME:
+            self.seek_replay(0.0)
+        elif event.key == pygame.K_UP:
+            self.replay_speed = min(64.0, self.replay_speed * 2)
+        elif event.key == pygame.K_DOWN:
+            self.replay_speed = max(0.125, self.replay_speed / 2)
+        return True
+    
+    def seek_replay(self, clock):
+        """Moves the replay to session clock `clock` and shows its state"""
+        replay = self.replay
+        applied = replay.seek(clock)
+        if replay.core is not self.core or len(self.stars) != len(replay.core.placements):
+            # Restarted or reset, or stars were placed
+            self.core = replay.core
+            self.params = replay.core.params
+            self.stars = [Star(placement, self.params) for placement in self.core.placements]
+            self.hazards = None
+            self.exposure = None
+            self.dodge_path.set_plan(None)
+            self.refresh_heatmap()
+        elif any(event["event"] == "param" for event in applied):
+            self.render_cache.invalidate()
+            self.hazards = None
+            self.exposure = None
+            self.refresh_heatmap()
+        self.state = GameState.PLAYING if replay.playing else GameState.PAUSED
+        shown_time = replay.get_time()
+        self.timeline_end = max(self.timeline_end, shown_time)
+        for star, star_state in zip(self.stars, self.core.get_state(shown_time)):
+            star.update(star_state)
+    
+    def record(self, event, **data):
+        """Adds an event to the session recording, if one is being made"""
+        if self.recorder is not None:
+            self.recorder.record(event, self.core.time, **data)
     
     def adjust_param(self, direction):
         name, attr, min_val, max_val, step = self.param_names[self.selected_param]
         current = getattr(self.params, attr)
         new_val = current + (step * direction)
         new_val = max(min_val, min(max_val, new_val))
-        setattr(self.params, attr, new_val)
+        self.core.set_param(attr, new_val)
+        self.record("param", attr=attr, value=new_val)
+        self.render_cache.invalidate()
+        if self.hazards is not None:
+            self.hazards.invalidate_param(attr, self.core.time)
+        if self.exposure is not None:
+            self.exposure.invalidate_param(attr, self.core.time)
+        self.dodge_path.set_plan(None)
+        self.refresh_preview()
         
-        # Update existing stars and rings if needed
+        # Update existing stars if needed
         for star in self.stars:
             star.params = self.params
-            star.ring.params = self.params
+        self.refresh_heatmap()
+    
+    def refresh_preview(self):
+        """Recomputes the what-if preview from the shown time, if it is on"""
+        if self.preview.enabled and self.stars and self.replay is None:
+            self.preview.request(self.core, self.get_display_time())
+        else:
+            self.preview.clear()
+    
+    def refresh_heatmap(self):
+        """Starts recomputing the damage coverage heatmap if it is being shown"""
+        if self.show_heatmap:
+            self.heatmap.request(self.core.placements, self.params)
+        if self.dirty_renderer is not None:
+            self.dirty_renderer.invalidate()
+    
+    def get_hazards(self):
+        if self.hazards is None:
+            self.hazards = HazardIndex(self.core)
+        return self.hazards
+    
+    def get_exposure(self):
+        if self.exposure is None:
+            self.exposure = ExposureTracker(self.core, tick_length=SIM_TICK)
+        return self.exposure
+    
+    def get_spot_safety(self, pos):
+        """Whether the arena spot at pos stays out of damage for the next SPOT_LOOKAHEAD seconds"""
+        if math.hypot(pos[0] - self.arena.center_x, pos[1] - self.arena.center_y) > self.arena.radius:
+            return None
+        t = self.get_display_time()
+        return bool(self.get_hazards().is_window_safe(pos[0], pos[1], t, t + SPOT_LOOKAHEAD))
+    
+    def plan_dodge_path(self, start):
+        """Plans the least-damage path from start, beginning at the shown time"""
+        if not self.stars:
+            return
+        try:
+            plan = plan_dodge_path(self.core, start, start_time=self.get_display_time())
+        except ValueError as e:
+            print(f"Cannot plan a dodge path: {e}")
+            return
+        self.dodge_path.set_plan(plan)
+        status = "no damage" if plan.is_safe() else f"{plan.exposure:.2f}s in damaging rings"
+        print(f"Planned dodge path from ({start[0]}, {start[1]}) at {plan.times[0]:.2f}s: {status}")
+    
+    def export_heatmap(self, path="coverage.npz"):
+        if self.heatmap.coverage is None and self.heatmap.future is None:
+            self.heatmap.request(self.core.placements, self.params)
+        if self.heatmap.wait() and self.dirty_renderer is not None:
+            self.dirty_renderer.invalidate()
+        if self.heatmap.coverage is not None:
+            self.heatmap.coverage.save(path)
+            print(f"Saved damage coverage to: {os.path.abspath(path)}")
     
     def reset(self):
+        self.record("reset")
         self.stars = []
+        self.core = SimulationCore(params=self.params, keyframe_capacity=self.keyframe_capacity)
+        self.hazards = None
+        self.exposure = None
+        self.dodge_path.set_plan(None)
+        self.preview.clear()
+        self.heatmap.request(self.core.placements, self.params)
+        if self.dirty_renderer is not None:
+            self.dirty_renderer.invalidate()
         self.state = GameState.SETUP
-        self.simulation_start_time = 0
-        self.history.clear()
         self.is_rewinding = False
-        self.rewind_index = 0
-        self.current_simulation_time = 0
+        self.rewind_time = 0.0
+        self.timeline_end = 0.0
+        self.tick_accumulator = 0.0
         self.rewind_frame_skip = 15  # Reset to default
     
+    def load_scenario(self, placements, params):
+        """Replaces the stars and parameters, e.g. with a placement search result"""
+        self.reset()
+        self.star_count = max(self.star_count, len(placements))
+        for attr, value in params.to_dict().items():
+            self.core.set_param(attr, value)
+            self.record("param", attr=attr, value=value)
+        for placement in placements:
+            self.core.add_star(placement)
+            self.record("star", x=placement.x, y=placement.y, clockwise=placement.clockwise)
+            self.stars.append(Star(placement, self.params))
+        self.state = GameState.SETUP if len(self.stars) < self.star_count else GameState.PAUSED
+        self.refresh_heatmap()
+    
     def soft_reset(self):
         """Reset simulation state but keep star positions"""
         if len(self.stars) > 0:
             # Reset each star to its initial position while keeping the placement
-            for star in self.stars:
-                star.x = star.start_x
-                star.y = star.start_y
-                star.angle = math.atan2(star.start_y - WINDOW_HEIGHT//2, star.start_x - WINDOW_WIDTH//2)
-                star.ring.expansion_level = 0
+            self.core.reset()
+            self.record("soft_reset")
+            # The reset drops rotation history, which everything derived from it relied on
+            self.hazards = None
+            self.exposure = None
+            self.dodge_path.set_plan(None)
+            for star, star_state in zip(self.stars, self.core.get_state()):
+                star.update(star_state)
+            self.refresh_preview()
             
             # Reset simulation state
-            self.state = GameState.SETUP if len(self.stars) < 6 else GameState.PAUSED
-            self.simulation_start_time = 0
-            self.history.clear()
+            self.state = GameState.SETUP if len(self.stars) < self.star_count else GameState.PAUSED
             self.is_rewinding = False
-            self.rewind_index = 0
-            self.current_simulation_time = 0
-    
-    def save_to_history(self):
-        """Save current game state to history"""
-        if self.state == GameState.PLAYING:
-            state = {
-                'time': time.time() - self.simulation_start_time,
-                'stars': [star.get_state() for star in self.stars]
-            }
-            self.history.append(state)
-    
-    def restore_from_history(self, index):
-        """Restore game state from history at given index"""
-        if 0 <= index < len(self.history):
-            state = self.history[index]
-            for i, star_state in enumerate(state['stars']):
-                if i < len(self.stars):
-                    self.stars[i].set_state(star_state)
-            self.current_simulation_time = state['time']
-    
-    def update(self):
-        current_time = time.time()
+            self.rewind_time = 0.0
+            self.timeline_end = 0.0
+            self.tick_accumulator = 0.0
+    
+    def start_rewind(self):
+        self.rewind_time = self.get_display_time()
+        self.is_rewinding = True
+        self.state = GameState.PAUSED
+        self.record("rewind_start")
+    
+    def stop_rewind(self):
+        """Leaves rewind mode, continuing the simulation from the rewound time"""
+        self.is_rewinding = False
+        self.is_scrubbing = False
+        self.record("rewind", to=self.rewind_time)
+        self.core.seek(self.rewind_time)
+        self.tick_accumulator = 0.0
+    
+    def get_display_time(self):
+        """Simulation time currently on screen, which can fall between ticks"""
+        if self.replay is not None:
+            return self.replay.get_time()
+        if self.is_rewinding:
+            return self.rewind_time
+        return self.core.time + self.tick_accumulator
+    
+    def seek(self, t):
+        """Shows the fight at simulation time t without replaying anything"""
+        self.rewind_time = max(self.core.get_earliest_time(), min(self.get_timeline_length(), t))
+        for star, star_state in zip(self.stars, self.core.get_state(self.rewind_time)):
+            star.update(star_state)
+    
+    def get_timeline_length(self):
+        return max(self.timeline_end, MIN_TIMELINE_LENGTH)
+    
+    def get_timeline_time(self, x):
+        rect = self.timeline_rect
+        fraction = max(0.0, min(1.0, (x - rect.x) / rect.width))
+        return fraction * self.get_timeline_length()
+    
+    def update(self, dt=None):
+        """Advances the simulation by dt seconds (default: the last clock tick).
+        
+        The simulation only moves in fixed SIM_TICK steps, running as many as
+        the elapsed time calls for; stars are then shown interpolated between
+        the last tick and the next one.
+        """
+        if dt is None:
+            dt = self.clock.get_time() / 1000.0
+        self.preview.poll()
+        if self.heatmap.poll() and self.dirty_renderer is not None:
+            self.dirty_renderer.invalidate()
+        if self.replay is not None:
+            if not self.replay_paused:
+                self.seek_replay(self.replay.clock + min(dt, self.max_frame_time) * self.replay_speed)
+            return
         is_playing = self.state == GameState.PLAYING
         
-        # Save state to history if playing
+        # Advance simulation time and update stars only if not rewinding
         if is_playing and not self.is_rewinding:
-            self.save_to_history()
-        
-        # Update stars only if not rewinding
-        if not self.is_rewinding:
-            for star in self.stars:
-                star.update(current_time, is_playing, self.simulation_start_time)
+            self.tick_accumulator += min(dt, self.max_frame_time)
+            while self.tick_accumulator >= SIM_TICK:
+                self.tick()
+                self.tick_accumulator -= SIM_TICK
+            for star, star_state in zip(self.stars, self.core.get_state(self.get_display_time())):
+                star.update(star_state)
+    
+    def tick(self):
+        """One fixed simulation step"""
+        self.core.advance(SIM_TICK)
+        if self.recorder is not None:
+            self.recorder.tick()
+        self.timeline_end = max(self.timeline_end, self.core.time)
     
     def draw(self):
-        self.screen.fill(BLACK)
-        
-        # Draw arena
-        self.arena.draw(self.screen)
+        profiler = self.profiler
+        with profiler.measure("arena"):
+            if self.dirty_renderer is not None:
+                self.dirty_renderer.begin(self.screen, self.draw_background)
+            else:
+                self.draw_background(self.screen)
+        rects = []
         
         # Draw rings first (so they appear under stars)
-        current_time = time.time()
-        is_playing = self.state == GameState.PLAYING
-        for star in self.stars:
-            star.draw_ring(self.screen, current_time, self.simulation_start_time, is_playing)
+        with profiler.measure("rings"):
+            is_playing = self.state == GameState.PLAYING
+            simulation_time = self.get_display_time()
+            if self.exposure_overlay.enabled and self.stars:
+                rects.append(self.exposure_overlay.draw(self.screen, self.get_exposure(), simulation_time,
+                                                          is_playing))
+            rects.extend(self.ring_layer.draw(self.screen, self.core.get_rings(simulation_time), is_playing))
+            preview_rect = self.preview.draw(self.screen, simulation_time)
+            if preview_rect is not None:
+                rects.append(preview_rect)
         
-        # Draw stars
-        for star in self.stars:
-            star.draw(self.screen)
+        # Draw stars, over the planned dodge path
+        with profiler.measure("stars"):
+            path_rect = self.dodge_path.draw(self.screen, simulation_time)
+            if path_rect is not None:
+                rects.append(path_rect)
+            for star in self.stars:
+                rects.append(star.draw(self.screen, self.render_cache))
+        
+        with profiler.measure("ui"):
+            # Draw UI text
+            rects.extend(self.draw_ui())
+            
+            # Draw timeline scrubber
+            if self.state in [GameState.PLAYING, GameState.PAUSED]:
+                rects.append(self.draw_timeline())
+            
+            if self.perf_hud.visible:
+                rects.append(self.perf_hud.draw(self.screen, (WINDOW_WIDTH - 260, 60 + self.get_panel_height())))
+        
+        # Draw parameter controls
+        with profiler.measure("parameters"):
+            rects.append(self.draw_parameters())
         
-        # Draw UI text
+        with profiler.measure("flip"):
+            if self.dirty_renderer is not None:
+                self.dirty_renderer.present(rects)
+            else:
+                pygame.display.flip()
+    
+    def draw_background(self, surface):
+        """Draws the static layers that everything else goes on top of"""
+        surface.fill(BLACK)
+        
+        # Draw arena
+        self.arena.draw(surface)
+        
+        if self.show_heatmap:
+            self.heatmap.draw(surface)
+    
+    def draw_ui(self):
+        rects = []
+        if self.replay is not None:
+            return self.draw_replay_ui()
         if self.state == GameState.SETUP:
-            text = self.font.render(f"Place {6 - len(self.stars)} more stars", 
-                                  True, WHITE)
-            self.screen.blit(text, (10, 10))
+            text = self.render_cache.render_text(self.font, f"Place {self.star_count - len(self.stars)} more stars", WHITE)
+            rects.append(self.screen.blit(text, (10, 10)))
             
             instructions = [
                 "Click to place stars",
-                "Space to start when all 6 are placed",
+                f"Space to start when all {self.star_count} are placed",
                 "Shift+R to reset simulation (keeps stars)",
                 "Ctrl+Shift+R to clear everything",
-                "Arrow keys to adjust parameters"
+                "Arrow keys to adjust parameters",
+                "H: heatmap, E: export it, P: dodge path, W: what-if preview, X: live exposure"
             ]
             for i, instruction in enumerate(instructions):
-                text = self.small_font.render(instruction, True, WHITE)
-                self.screen.blit(text, (10, WINDOW_HEIGHT - 100 + i * 25))
+                text = self.render_cache.render_text(self.small_font, instruction, WHITE)
+                rects.append(self.screen.blit(text, (10, WINDOW_HEIGHT - 150 + i * 25)))
                 
         elif self.state == GameState.PLAYING:
             if self.is_rewinding:
-                text = self.font.render(f"REWINDING - Frame {self.rewind_index}/{len(self.history)}", True, YELLOW)
-                self.screen.blit(text, (10, 10))
-                time_text = self.small_font.render(f"Time: {self.current_simulation_time:.2f}s", True, YELLOW)
-                self.screen.blit(time_text, (10, 45))
+                text = self.render_cache.render_text(self.font, f"REWINDING - {self.rewind_time:.2f}s/{self.timeline_end:.2f}s", YELLOW)
+                rects.append(self.screen.blit(text, (10, 10)))
+                time_text = self.render_cache.render_text(self.small_font, f"Time: {self.rewind_time:.2f}s", YELLOW)
+                rects.append(self.screen.blit(time_text, (10, 45)))
             else:
-                text = self.font.render("Simulation Running", True, WHITE)
-                self.screen.blit(text, (10, 10))
+                text = self.render_cache.render_text(self.font, "Simulation Running", WHITE)
+                rects.append(self.screen.blit(text, (10, 10)))
                 
             instructions = [
                 "Space to pause",
@@ -466,29 +1213,30 @@ class WoWBossSimulation:
                 "Ctrl+Shift+R to clear everything"
             ]
             for i, instruction in enumerate(instructions):
-                text = self.small_font.render(instruction, True, WHITE)
-                self.screen.blit(text, (10, WINDOW_HEIGHT - 80 + i * 25))
+                text = self.render_cache.render_text(self.small_font, instruction, WHITE)
+                rects.append(self.screen.blit(text, (10, WINDOW_HEIGHT - 80 + i * 25)))
                 
         elif self.state == GameState.PAUSED:
             if self.is_rewinding:
-                text = self.font.render(f"REWIND MODE - Frame {self.rewind_index}/{len(self.history)}", True, YELLOW)
-                self.screen.blit(text, (10, 10))
-                time_text = self.small_font.render(f"Time: {self.current_simulation_time:.2f}s | Frame Skip: {self.rewind_frame_skip}", True, YELLOW)
-                self.screen.blit(time_text, (10, 45))
+                text = self.render_cache.render_text(self.font, f"REWIND MODE - {self.rewind_time:.2f}s/{self.timeline_end:.2f}s", YELLOW)
+                rects.append(self.screen.blit(text, (10, 10)))
+                time_text = self.render_cache.render_text(self.small_font, f"Time: {self.rewind_time:.2f}s | Frame Skip: {self.rewind_frame_skip}", YELLOW)
+                rects.append(self.screen.blit(time_text, (10, 45)))
                 
                 instructions = [
                     f"LEFT/RIGHT arrows to scrub through time ({self.rewind_frame_skip} frames)",
                     "UP/DOWN arrows to adjust frame skip (+/- 5)",
+                    "HOME/END or click the timeline to jump",
                     "R to exit rewind mode",
                     "Space to resume from this point",
                     "Shift+R to reset simulation (keeps stars)"
                 ]
                 for i, instruction in enumerate(instructions):
-                    text = self.small_font.render(instruction, True, YELLOW)
-                    self.screen.blit(text, (10, WINDOW_HEIGHT - 130 + i * 25))
+                    text = self.render_cache.render_text(self.small_font, instruction, YELLOW)
+                    rects.append(self.screen.blit(text, (10, WINDOW_HEIGHT - 155 + i * 25)))
             else:
-                text = self.font.render("PAUSED", True, WHITE)
-                self.screen.blit(text, (10, 10))
+                text = self.render_cache.render_text(self.font, "PAUSED", WHITE)
+                rects.append(self.screen.blit(text, (10, 10)))
                 
                 instructions = [
                     "Space to resume",
@@ -497,25 +1245,75 @@ class WoWBossSimulation:
                     "Ctrl+Shift+R to clear everything"
                 ]
                 for i, instruction in enumerate(instructions):
-                    text = self.small_font.render(instruction, True, WHITE)
-                    self.screen.blit(text, (10, WINDOW_HEIGHT - 80 + i * 25))
+                    text = self.render_cache.render_text(self.small_font, instruction, WHITE)
+                    rects.append(self.screen.blit(text, (10, WINDOW_HEIGHT - 80 + i * 25)))
         
-        # Draw parameter controls
-        self.draw_parameters()
+        if self.state in [GameState.PLAYING, GameState.PAUSED]:
+            is_safe = self.get_spot_safety(pygame.mouse.get_pos())
+            if is_safe is not None:
+                label = "safe" if is_safe else "hit"
+                text = self.render_cache.render_text(
+                    self.small_font, f"Cursor spot: {label} for next {SPOT_LOOKAHEAD:.0f}s",
+                    GREEN if is_safe else RED)
+                rects.append(self.screen.blit(text, (10, 75)))
+        return rects
+    
+    def draw_replay_ui(self):
+        replay = self.replay
+        status = "PAUSED" if self.replay_paused else f"x{self.replay_speed:g}"
+        text = self.render_cache.render_text(
+            self.font, f"REPLAY {replay.clock:.1f}s/{replay.get_length():.1f}s {status}", YELLOW)
+        rects = [self.screen.blit(text, (10, 10))]
+        instructions = [
+            "Space to pause/resume playback",
+            "LEFT/RIGHT to skip 5s, HOME to restart",
+            "UP/DOWN to change playback speed"
+        ]
+        for i, instruction in enumerate(instructions):
+            text = self.render_cache.render_text(self.small_font, instruction, YELLOW)
+            rects.append(self.screen.blit(text, (10, WINDOW_HEIGHT - 80 + i * 25)))
+        return rects
+    
+    def draw_timeline(self):
+        rect = self.timeline_rect
+        length = self.get_timeline_length()
+        rects = [pygame.draw.rect(self.screen, (50, 50, 50), rect)]
         
-        pygame.display.flip()
+        # Portion of the fight already played
+        played_width = int(rect.width * self.timeline_end / length)
+        pygame.draw.rect(self.screen, (100, 100, 200), (rect.x, rect.y, played_width, rect.height))
+        
+        # Keyframes mark where the rotation speed changed
+        keyframes = self.core.keyframes
+        for i in range(1, len(keyframes)):
+            key_x = rect.x + int(rect.width * keyframes.get_time(i) / length)
+            pygame.draw.line(self.screen, GRAY, (key_x, rect.y), (key_x, rect.bottom - 1))
+        
+        # Cursor at the time being shown
+        shown_time = self.get_display_time()
+        cursor_x = rect.x + int(rect.width * shown_time / length)
+        rects.append(pygame.draw.line(self.screen, YELLOW if self.is_rewinding else WHITE,
+                                      (cursor_x, rect.y - 3), (cursor_x, rect.bottom + 2), 3))
+        pygame.draw.rect(self.screen, WHITE, rect, 1)
+        
+        label = self.render_cache.render_text(self.tiny_font, f"{length:.0f}s", WHITE)
+        rects.append(self.screen.blit(label, (rect.right + 6, rect.y)))
+        return rects[0].unionall(rects[1:])
+    
+    def get_panel_height(self):
+        return max(300, 60 + len(self.param_names) * 45)
     
     def draw_parameters(self):
         # Draw parameter panel background - narrower and anchored to right
         panel_width = 250  # Fixed narrow width
         panel_x = WINDOW_WIDTH - panel_width - 10  # 10px from right edge
         panel_y = 50
-        panel_height = 300
+        panel_height = self.get_panel_height()
         
-        pygame.draw.rect(self.screen, GRAY, (panel_x, panel_y, panel_width, panel_height), 2)
+        panel_rect = pygame.draw.rect(self.screen, GRAY, (panel_x, panel_y, panel_width, panel_height), 2)
         
         # Title
-        title = self.small_font.render("PARAMETERS", True, WHITE)
+        title = self.render_cache.render_text(self.small_font, "PARAMETERS", WHITE)
         self.screen.blit(title, (panel_x + 10, panel_y + 10))
         
         # Draw each parameter
@@ -528,12 +1326,12 @@ class WoWBossSimulation:
                                (panel_x + 5, y_offset - 5, panel_width - 10, 40))
             
             # Parameter name
-            text = self.tiny_font.render(name + ":", True, WHITE)
+            text = self.render_cache.render_text(self.tiny_font, name + ":", WHITE)
             self.screen.blit(text, (panel_x + 10, y_offset))
             
             # Current value
             value = getattr(self.params, attr)
-            value_text = self.tiny_font.render(f"{value:.3f}", True, YELLOW)
+            value_text = self.render_cache.render_text(self.tiny_font, f"{value:.3f}", YELLOW)
             self.screen.blit(value_text, (panel_x + 10, y_offset + 20))
             
             # Value bar
@@ -555,16 +1353,65 @@ class WoWBossSimulation:
             # Border
             pygame.draw.rect(self.screen, WHITE, 
                            (bar_x, bar_y, bar_width, bar_height), 1)
+        return panel_rect
     
-    def run(self):
-        while self.running:
+    def run_frame(self, dt=None):
+        """Handles input, advances and draws one frame, timing each phase"""
+        profiler = self.profiler
+        profiler.begin_frame()
+        with profiler.measure("events"):
             self.handle_events()
-            self.update()
+        with profiler.measure("update"):
+            self.update(dt)
+        with profiler.measure("draw"):
             self.draw()
-            self.clock.tick(FPS)
+        if self.time_to_first_frame is None:
+            now = time.perf_counter()
+            self.time_to_first_frame = now - self.created_at
+            print(f"First frame after {self.time_to_first_frame * 1000:.0f} ms "
+                  f"({(now - STARTUP_TIME) * 1000:.0f} ms since launch)")
+    
+    def run(self):
+        try:
+            while self.running:
+                self.run_frame()
+                tick_ms = self.clock.tick(self.render_fps)
+                self.perf_hud.add_frame(tick_ms, self.profiler.timings)
+                if self.trace is not None:
+                    self.trace.write(tick_ms, self.profiler.timings)
+        finally:
+            if self.trace is not None:
+                self.trace.close()
+            if self.recorder is not None:
+                self.recorder.close(self.core.time)
+            self.preview.shutdown()
+            self.heatmap.shutdown()
         
         pygame.quit()
 
 if __name__ == "__main__":
-    game = WoWBossSimulation()
+    parser = argparse.ArgumentParser(description="WoW boss fight simulation")
+    parser.add_argument('--scenario', help="Scenario JSON file with star placements and parameters")
+    parser.add_argument('--stars', type=int, default=DEFAULT_STAR_COUNT,
+                        help="Stars to place before the fight starts (the first half turn clockwise)")
+    parser.add_argument('--keyframes', type=int, default=DEFAULT_KEYFRAME_CAPACITY,
+                        help="Rewind keyframe buffer capacity (one keyframe per rotation speed change)")
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help="Only redraw and update the parts of the window that changed")
+    parser.add_argument('--trace', help="Write per-frame phase timings to a .csv or .jsonl file")
+    parser.add_argument('--fps', type=int, default=FPS,
+                        help="Render frame rate cap, 0 for uncapped (the simulation always ticks at %d Hz)" % FPS)
+    parser.add_argument('--record', help="Record the session's events to a .jsonl file")
+    parser.add_argument('--replay', help="Play back a recorded session instead of taking input")
+    parser.add_argument('--replay-speed', type=float, default=1.0)
+    parser.add_argument('--cache-dir', help="Keep decoded background pixels here for faster launches "
+                        "(on by default in the standalone build)")
+    args = parser.parse_args()
+    
+    game = WoWBossSimulation(keyframe_capacity=args.keyframes, dirty_rects=args.dirty_rects,
+                             trace_path=args.trace, render_fps=args.fps, record_path=args.record,
+                             replay_path=args.replay, replay_speed=args.replay_speed,
+                             cache_dir=args.cache_dir or get_default_cache_dir(), star_count=args.stars)
+    if args.scenario:
+        game.load_scenario(*load_scenario(args.scenario))
     game.run()
\ No newline at end of file